@@ -0,0 +1,77 @@
+"""
+Compare starlette's JSONResponse with mspt's ORJSONResponse on TradePaginated
+and StudyItemPaginated payloads of 20, 100 and 1000 items. The content is put
+through jsonable_encoder first, as FastAPI does, both renders are checked to
+decode to the same document.
+
+    python -m benchmarks.json_responses
+"""
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from mspt.apps.mspt import schemas
+from mspt.utils.responses import ORJSONResponse
+
+SIZES = (20, 100, 1000)
+REPEAT = int(os.environ.get('BENCH_REPEAT', 50))
+
+DESCRIPTION = 'lorem ipsum ' * 40
+OWNER = {'uid': 1, 'email': 'bench@example.com', 'is_active': True, 'is_superuser': False, 'first_name': 'Bench', 'last_name': 'Mark'}
+INSTRUMENT = {'uid': 1, 'name': 'EURUSD', 'owner_uid': 1, 'public': False, 'owner': OWNER}
+STRATEGY = {'uid': 1, 'name': 'breakout', 'description': DESCRIPTION, 'owner_uid': 1, 'public': False, 'owner': OWNER}
+STYLE = {'uid': 1, 'name': 'swing', 'description': DESCRIPTION, 'owner_uid': 1, 'public': False, 'owner': OWNER}
+
+
+def _trades(size: int) -> schemas.TradePaginated:
+    start = datetime(2020, 1, 1, 8, 30, 15, 250000)
+    items = [{
+        'uid': i, 'owner_uid': 1, 'public': False, 'instrument_uid': 1, 'strategy_uid': 1, 'style_uid': 1,
+        'position': i % 2 == 0, 'outcome': i % 3 != 0, 'status': False, 'pips': i % 90, 'rr': 1.75,
+        'description': DESCRIPTION, 'date': start + timedelta(hours=i), 'sl': 20, 'tp': 40,
+        'entry_price': 1.12345, 'sl_price': 1.12145, 'tp_price': 1.12745,
+        'instrument': INSTRUMENT, 'strategy': STRATEGY, 'style': STYLE, 'owner': OWNER,
+    } for i in range(size)]
+    return schemas.TradePaginated(items=items, size=size, count=size, page=1, pages=1)
+
+
+def _studyitems(size: int) -> schemas.StudyItemPaginated:
+    start = datetime(2020, 1, 1)
+    items = [{
+        'uid': i, 'description': DESCRIPTION, 'study_uid': '1', 'instrument_uid': 1, 'position': True,
+        'outcome': i % 2 == 0, 'pips': i % 90, 'rrr': 2.5, 'style_uid': 1, 'date': start + timedelta(days=i),
+        'public': False, 'instrument': INSTRUMENT, 'style': STYLE,
+    } for i in range(size)]
+    return schemas.StudyItemPaginated(items=items, size=size, count=size, page=1, pages=1)
+
+
+def _time(fn) -> float:
+    """Median milliseconds of `fn` over REPEAT runs, after one warm up run"""
+    fn()
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    print(f"{'payload':<12}{'items':>6}{'json ms':>10}{'orjson ms':>11}{'speedup':>9}{'bytes':>10}")
+    for name, build in (('trades', _trades), ('studyitems', _studyitems)):
+        for size in SIZES:
+            content = jsonable_encoder(build(size))
+            rendered = ORJSONResponse(content).body
+            assert json.loads(rendered) == json.loads(JSONResponse(content).body)
+            stdlib = _time(lambda: JSONResponse(content))
+            fast = _time(lambda: ORJSONResponse(content))
+            print(f"{name:<12}{size:>6}{stdlib:>10.2f}{fast:>11.2f}{stdlib / fast:>8.1f}x{len(rendered):>10}")
+
+
+if __name__ == '__main__':
+    main()
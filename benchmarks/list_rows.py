@@ -0,0 +1,136 @@
+"""
+Compare the ORM listing path (get_paginated_multi) with the row path
+(get_paginated_rows) for trade and study item listings of 20, 100 and 1000
+items, including the response model validation and encoding FastAPI does.
+
+    python -m benchmarks.list_rows
+
+Runs on an in-memory SQLite database unless BENCH_DATABASE_URL points
+elsewhere (tables are created there, use a scratch database). The app's own
+settings still need to import, as they do for the server.
+"""
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+# users.crud goes first, as in the app, it and settings.security import each other
+from mspt.apps.users import crud as user_crud  # noqa: F401
+from mspt.apps.mixins.crud import count_cache
+from mspt.apps.mspt import crud, models, schemas
+from mspt.apps.users.models import User
+from mspt.settings.database import DBModel
+
+SIZES = (20, 100, 1000)
+REPEAT = int(os.environ.get('BENCH_REPEAT', 20))
+
+
+def _session_factory():
+    url = os.environ.get('BENCH_DATABASE_URL', 'sqlite://')
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url)
+    # only what the listings read, SQLite cannot create the composite key association tables
+    tables = [model.__table__ for model in (User, models.Instrument, models.Strategy, models.Style, models.Trade, models.Study, models.StudyItem)]
+    DBModel.metadata.create_all(engine, tables=tables)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _seed(db, rows: int):
+    user = User(email=f"bench-{time.time()}@example.com", first_name='Bench', last_name='Mark', hashed_password='x' * 60)
+    db.add(user)
+    db.flush()
+    description = 'lorem ipsum ' * 40
+    instruments = [models.Instrument(name=f"PAIR{i}", owner_uid=user.uid) for i in range(5)]
+    strategies = [models.Strategy(name=f"strategy {i}", description=description, owner_uid=user.uid) for i in range(5)]
+    styles = [models.Style(name=f"style {i}", description=description, owner_uid=user.uid) for i in range(3)]
+    study = models.Study(name='study', description=description, owner_uid=user.uid)
+    db.add_all(instruments + strategies + styles + [study])
+    db.flush()
+
+    start = datetime(2020, 1, 1)
+    for i in range(rows):
+        db.add(models.Trade(
+            owner_uid=user.uid,
+            date=start + timedelta(hours=i),
+            instrument_uid=instruments[i % 5].uid,
+            strategy_uid=strategies[i % 5].uid,
+            style_uid=styles[i % 3].uid,
+            pips=i % 90,
+            rr=1.5,
+            description=description,
+        ))
+        db.add(models.StudyItem(
+            name=f"item {i}",
+            description=description,
+            study_uid=study.uid,
+            instrument_uid=instruments[i % 5].uid,
+            style_uid=styles[i % 3].uid,
+            pips=i % 90,
+            rrr=2.0,
+            date=start + timedelta(hours=i),
+        ))
+    db.commit()
+    return user.uid, study.uid
+
+
+def _request(path: str) -> Request:
+    return Request({
+        'type': 'http', 'method': 'GET', 'scheme': 'http', 'server': ('bench', 80),
+        'path': path, 'query_string': b'', 'headers': [],
+    })
+
+
+def _time(fn) -> float:
+    """Median milliseconds of `fn` over REPEAT runs, after one warm up run"""
+    fn()
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _listing(Session, crud_obj, method, response_model, size, **kwargs):
+    def run():
+        # a fresh session per request, as get_db gives, so the identity map starts empty
+        db = Session()
+        try:
+            paginated = getattr(crud_obj, method)(db, request=_request('/bench'), page=1, size=size, sort_on='uid', sort_order='desc', **kwargs)
+            return jsonable_encoder(response_model(**paginated))
+        finally:
+            db.close()
+    return run
+
+
+def main():
+    Session = _session_factory()
+    db = Session()
+    owner_uid, study_uid = _seed(db, max(SIZES))
+    db.close()
+    count_cache.clear()
+
+    cases = (
+        ('trades', crud.trade, schemas.TradePaginated, {'owner_uid': owner_uid}),
+        ('studyitems', crud.studyitem, schemas.StudyItemPaginated, {
+            'other_filters': [{'field': 'study_uid', 'op': '==', 'value': study_uid}],
+        }),
+    )
+    print(f"{'listing':<12}{'rows':>6}{'orm ms':>10}{'rows ms':>10}{'speedup':>9}")
+    for name, crud_obj, response_model, kwargs in cases:
+        for size in SIZES:
+            orm = _time(_listing(Session, crud_obj, 'get_paginated_multi', response_model, size, **kwargs))
+            rows = _time(_listing(Session, crud_obj, 'get_paginated_rows', response_model, size, **kwargs))
+            print(f"{name:<12}{size:>6}{orm:>10.2f}{rows:>10.2f}{orm / rows:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from mspt.apps import login
+from mspt.apps.core import routes as core_routes
 from mspt.apps.users import routes as user_routes
 from mspt.apps.mspt import routes as mspt_routes
 
@@ -16,4 +17,4 @@ api_router.include_router(mspt_routes.task_router, prefix="/mspt", tags=["mspt"]
 api_router.include_router(mspt_routes.trading_plan_router, prefix="/mspt", tags=["mspt"])
 api_router.include_router(mspt_routes.study_router, prefix="/mspt", tags=["mspt"])
 api_router.include_router(mspt_routes.statistics_router, prefix="/performance", tags=["mspt"])
-
+api_router.include_router(core_routes.router, prefix="/core", tags=["core"])
@@ -0,0 +1,52 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+)
+
+from mspt.apps.users import models as user_models
+from mspt.settings.database import engine
+from mspt.settings.database.pool import pool_metrics
+from mspt.settings.hashing import hash_pool
+from mspt.settings.security import (
+    get_current_active_superuser,
+    login_latency,
+    password_verify_latency,
+    token_cache,
+    user_cache,
+)
+
+router = APIRouter()
+
+
+@router.get("/metrics/db-pool")
+def read_db_pool_metrics(
+        current_user: user_models.User = Depends(get_current_active_superuser),
+):
+    """
+    Live connection pool statistics and checkout latency histogram.
+    """
+    return pool_metrics.snapshot(engine.pool)
+
+
+@router.get("/metrics/auth-cache")
+def read_auth_cache_metrics(
+        current_user: user_models.User = Depends(get_current_active_superuser),
+):
+    """
+    Hit/miss counters of the authenticated user and access token caches.
+    """
+    return {'users': user_cache.stats(), 'tokens': token_cache.stats()}
+
+
+@router.get("/metrics/login")
+def read_login_metrics(
+        current_user: user_models.User = Depends(get_current_active_superuser),
+):
+    """
+    Login latency histograms and password hashing pool usage.
+    """
+    return {
+        'login': login_latency.snapshot(),
+        'password_verify': password_verify_latency.snapshot(),
+        'hash_pool': hash_pool.stats(),
+    }
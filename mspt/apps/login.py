@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from mspt.apps.users import crud
 from mspt.settings.utils import  get_db
-from mspt.settings.security import get_current_user, get_password_hash
+from mspt.settings.security import get_current_user, get_password_hash, invalidate_cached_user, login_latency
 from mspt.settings import config
 from mspt.settings.jwt import create_access_token
 from mspt.apps.users.models import User as DBUser
@@ -29,15 +29,16 @@ router = APIRouter()
 
 
 @router.post("/login/access-token", response_model=TokenWithExtras, tags=["login"])
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
-        db, email=form_data.username, password=form_data.password
-    )
+    with login_latency.time():
+        user = await crud.user.authenticate_async(
+            db, email=form_data.username, password=form_data.password
+        )
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not crud.user.is_active(user):
@@ -103,4 +104,5 @@ def reset_password(token: str = Body(...), new_password: str = Body(...), db: Se
     user.hashed_password = hashed_password
     db.add(user)
     db.commit()
+    invalidate_cached_user(user.uid)
     return {"msg": "Password updated successfully"}
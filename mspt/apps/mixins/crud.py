@@ -1,13 +1,23 @@
-from typing import List, Optional, Generic, TypeVar, Type, Any, Dict
+import json
+from typing import List, Optional, Generic, TypeVar, Type, Any, Dict, Mapping, Tuple
 
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy.inspection import inspect
 from sqlalchemy.orm import Session
 
+from mspt.apps.mixins.projection import apply_projection, apply_row_projection, shape_rows
+from mspt.settings import config
 from mspt.settings.database import DBModel
+from mspt.settings.database.mixins import eager_expr
 from mspt.settings.database.sqlalchemy_filters import apply_pagination
+from mspt.settings.database.sqlalchemy_filters import apply_keyset_pagination
 from mspt.settings.database.sqlalchemy_filters import apply_filters
 from mspt.settings.database.sqlalchemy_filters import apply_sort
+from mspt.settings.database.sqlalchemy_filters.counting import COUNT_CACHED, COUNT_ESTIMATE
+from mspt.settings.database.sqlalchemy_filters.exceptions import InvalidPage
+from mspt.utils.cache import TTLCache
 
 
 ModelType = TypeVar("ModelType", bound=DBModel)
@@ -15,10 +25,31 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+# Listing totals per (model, owner_uid, filter spec), dropped whenever a CRUDMIXIN write touches the model.
+# The cache is per process: writes through other workers (or outside the app) are not seen, so a total
+# may be stale for up to PAGINATION_COUNT_CACHE_TTL seconds
+count_cache = TTLCache(maxsize=config.PAGINATION_COUNT_CACHE_SIZE, ttl=config.PAGINATION_COUNT_CACHE_TTL)
+
+
+# Loader profiles, how much of the object graph a query loads up front
+PROFILE_LIST = 'list'
+PROFILE_DETAIL = 'detail'
+
+
 def _maintain_url_params(shared: bool, sort_on: str, sort_order: str):
     return f"&shared={shared}&sort_on={sort_on}&sort_order={sort_order}"
 
 class CRUDMIXIN(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # profile name -> eager load schema (see settings.database.mixins.eagerload),
+    # collections should use SELECTIN, a missing profile loads nothing eagerly
+    loader_profiles: Dict[str, Dict[str, Any]] = {}
+    # profile name -> response schema, a query with that profile loads only the
+    # columns the schema serializes (see apps.mixins.projection), meant for
+    # read only listings.
+    profile_schemas: Dict[str, Type[BaseModel]] = {}
+    # model -> its column attribute names, shared by every CRUD object (see model_fields)
+    _model_fields: Dict[type, Tuple[str, ...]] = {}
+
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -30,26 +61,122 @@ class CRUDMIXIN(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
-    def get(self, db_session: Session, uid: int) -> Optional[ModelType]:
-        return db_session.query(self.model).filter(self.model.uid == uid).first()
+    def get(self, db_session: Session, uid: int, *, profile: Optional[str] = None) -> Optional[ModelType]:
+        return self._query(db_session, profile).filter(self.model.uid == uid).first()
 
-    def get_for_user(self, db_session: Session, uid: int, owner_uid: int) -> Optional[ModelType]:
-        return db_session.query(self.model).filter(self.model.uid == uid, self.model.owner_uid == owner_uid).first()
+    def get_for_user(self, db_session: Session, uid: int, owner_uid: int, *, profile: Optional[str] = None) -> Optional[ModelType]:
+        return self._query(db_session, profile).filter(self.model.uid == uid, self.model.owner_uid == owner_uid).first()
 
-    def get_multi(self, db_session: Session, *, skip=0, limit=100) -> List[ModelType]:
-        return db_session.query(self.model).offset(skip).limit(limit).all()
+    def get_multi(self, db_session: Session, *, skip=0, limit=100, profile: Optional[str] = None) -> List[ModelType]:
+        return self._query(db_session, profile).offset(skip).limit(limit).all()
 
-    def get_multi_for_user(self, db_session: Session, *, owner_uid: int, skip=0, limit=100) -> List[ModelType]:
-        return db_session.query(self.model).filter(self.model.owner_uid == owner_uid).offset(skip).limit(limit).all()
+    def get_multi_for_user(self, db_session: Session, *, owner_uid: int, skip=0, limit=100, profile: Optional[str] = None) -> List[ModelType]:
+        return self._query(db_session, profile).filter(self.model.owner_uid == owner_uid).offset(skip).limit(limit).all()
 
-    def get_multi_shared(self, db_session: Session, *, public: bool, skip=0, limit=100) -> List[ModelType]:
-        return db_session.query(self.model).filter(self.model.public == public).offset(skip).limit(limit).all()
-    
-    def get_paginated_multi(self, db_session: Session, *, request, page=1, size=10, shared=False, owner_uid=None, sort_on='uid', sort_order='asc', other_filters = None) -> Dict[str, Any]:
-        extra_params = _maintain_url_params(shared=shared, sort_on=sort_on, sort_order=sort_order)
+    def get_multi_shared(self, db_session: Session, *, public: bool, skip=0, limit=100, profile: Optional[str] = None) -> List[ModelType]:
+        return self._query(db_session, profile).filter(self.model.public == public).offset(skip).limit(limit).all()
+
+    @property
+    def model_fields(self) -> Tuple[str, ...]:
+        """
+        Names of the model's column attributes, the fields update copies from
+        `obj_in`. Relationships are not among them, they are set on their own.
+        """
+        fields = self._model_fields.get(self.model)
+        if fields is None:
+            fields = self._model_fields[self.model] = tuple(prop.key for prop in inspect(self.model).column_attrs)
+        return fields
+
+    def _set_fields(self, db_obj: ModelType, obj_in: UpdateSchemaType):
+        update_data = obj_in.dict(skip_defaults=True)
+        for field in self.model_fields:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+
+    def _query(self, db_session: Session, profile: Optional[str] = None):
+        """Query of the model eager loading, and projected on, what `profile` asks for"""
         qry = db_session.query(self.model)
+        if not profile:
+            return qry
+        schema = self.loader_profiles.get(profile)
+        if schema:
+            qry = qry.options(*eager_expr(schema))
+        response_schema = self.profile_schemas.get(profile)
+        if response_schema:
+            qry = apply_projection(qry, self.model, response_schema)
+        return qry
+    
+    def get_paginated_multi(self, db_session: Session, *, request, page=1, size=10, shared=False, owner_uid=None, sort_on='uid', sort_order='asc', other_filters = None, cursor=None, profile: Optional[str] = PROFILE_LIST) -> Dict[str, Any]:
+        """
+        Paginate by page number, or by keyset when a `cursor` is given
+        (an empty cursor requests the first keyset page).
+        """
+        qry = self._listing_query(
+            db_session, 
+            shared=shared, 
+            owner_uid=owner_uid, 
+            sort_on=sort_on, 
+            sort_order=sort_order, 
+            other_filters=other_filters,
+            profile=profile
+        )
+        return self._paginate(
+            qry, 
+            request=request, 
+            page=page, 
+            size=size, 
+            shared=shared, 
+            sort_on=sort_on, 
+            sort_order=sort_order, 
+            cursor=cursor,
+            count_key=self._count_key(shared=shared, owner_uid=owner_uid, other_filters=other_filters)
+        )
+
+    def get_paginated_rows(self, db_session: Session, *, request, page=1, size=10, shared=False, owner_uid=None, sort_on='uid', sort_order='asc', other_filters = None, cursor=None, schema: Optional[Type[BaseModel]] = None) -> Dict[str, Any]:
+        """
+        Read only get_paginated_multi, items are dicts shaped like `schema`
+        (the list profile's schema by default) built straight from the rows of
+        one flat query, no ORM object is created. The schema may nest many-to-one
+        relationships only.
+        """
+        schema = schema or self.profile_schemas[PROFILE_LIST]
+        qry = self._listing_query(
+            db_session, 
+            shared=shared, 
+            owner_uid=owner_uid, 
+            sort_on=sort_on, 
+            sort_order=sort_order, 
+            other_filters=other_filters
+        )
+        paginated = self._paginate(
+            apply_row_projection(qry, self.model, schema, extra_columns=(sort_on,)), 
+            request=request, 
+            page=page, 
+            size=size, 
+            shared=shared, 
+            sort_on=sort_on, 
+            sort_order=sort_order, 
+            cursor=cursor,
+            count_key=self._count_key(shared=shared, owner_uid=owner_uid, other_filters=other_filters)
+        )
+        paginated['items'] = shape_rows(paginated['items'], self.model, schema)
+        return paginated
+
+    def _listing_query(self, db_session: Session, *, shared=False, owner_uid=None, sort_on='uid', sort_order='asc', other_filters = None, profile: Optional[str] = None):
+        qry = self._query(db_session, profile)
         
         # filter
+        filter_spec = self._filter_spec(shared=shared, owner_uid=owner_uid, other_filters=other_filters)
+        qry = apply_filters(qry, filter_spec)
+        
+        # sort, uid breaks ties so pages (and keyset cursors) are stable
+        sort_spec = [{'field': sort_on, 'direction': sort_order}]
+        if sort_on != 'uid':
+            sort_spec.append({'field': 'uid', 'direction': sort_order})
+        qry = apply_sort(qry, sort_spec)
+        return qry
+
+    def _filter_spec(self, *, shared=False, owner_uid=None, other_filters = None) -> List[Dict[str, Any]]:
         filter_spec = []
         
         # if shared: get shared irregardless of owner uid: get everything shared
@@ -63,17 +190,60 @@ class CRUDMIXIN(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if other_filters: # [{'field': 'xxxxx', 'op': '==', 'value': 'xxx}]
             for filter in other_filters:
                 filter_spec.append(filter)
+        return filter_spec
 
-        qry = apply_filters(qry, filter_spec)
-        
-        # sort
-        sort_spec = [{'field': sort_on, 'direction': sort_order}]
-        qry = apply_sort(qry, sort_spec)
+    def _count_key(self, *, shared=False, owner_uid=None, other_filters = None):
+        filter_spec = self._filter_spec(shared=shared, owner_uid=owner_uid, other_filters=other_filters)
+        return (self.model.__name__, None if shared else owner_uid, json.dumps(filter_spec, sort_keys=True, default=str))
+
+    def _invalidate_counts(self, db_obj: ModelType):
+        """Drop cached totals of the listings `db_obj` may appear in"""
+        name = self.model.__name__
+        if isinstance(db_obj, Mapping):
+            owner_uid = db_obj.get('owner_uid')
+        else:
+            owner_uid = getattr(db_obj, 'owner_uid', None)
+        count_cache.invalidate(
+            lambda key: key[0] == name and (owner_uid is None or key[1] in (owner_uid, None))
+        )
+
+    def _paginate(self, qry, *, request, page=1, size=10, shared=False, sort_on='uid', sort_order='asc', cursor=None, count_key=None) -> Dict[str, Any]:
+        """
+        Shared listings report the planner's estimated total, next_url comes
+        from a look-ahead row rather than from the estimate. Below
+        PAGINATION_ESTIMATE_THRESHOLD the exact total is fetched with the page
+        in the same statement instead. Owner listings
+        reuse totals from `count_cache` under `count_key` (stale for at most
+        its TTL across worker processes), on a miss the total is fetched with
+        the page in the same statement and cached.
+        """
+        extra_params = _maintain_url_params(shared=shared, sort_on=sort_on, sort_order=sort_order)
                 
         # Paginate        
-        paginated = apply_pagination(qry, page_number=page, page_size=size, request=request)
-        
-        paginated['items'] = paginated['items'].all() # query
+        try:
+            if cursor is not None:
+                paginated = apply_keyset_pagination(
+                    qry, 
+                    model=self.model, 
+                    sort_on=sort_on, 
+                    sort_order=sort_order, 
+                    cursor=cursor, 
+                    page_size=size, 
+                    request=request
+                )
+            else:
+                paginated = apply_pagination(
+                    qry, 
+                    page_number=page, 
+                    page_size=size, 
+                    request=request,
+                    count_strategy=COUNT_ESTIMATE if shared else COUNT_CACHED,
+                    count_cache=count_cache,
+                    count_key=count_key,
+                    estimate_threshold=config.PAGINATION_ESTIMATE_THRESHOLD
+                )
+        except InvalidPage as e:
+            raise HTTPException(status_code=400, detail=f"{e}")
         
         prev_url = paginated['prev_url']
         next_url = paginated['next_url']
@@ -83,29 +253,35 @@ class CRUDMIXIN(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return paginated
         
 
-    def create(self, db_session: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    def create(self, db_session: Session, *, obj_in: CreateSchemaType, profile: Optional[str] = PROFILE_DETAIL) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
     def update(
-        self, db_session: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType
+        self, db_session: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType, profile: Optional[str] = PROFILE_DETAIL
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(skip_defaults=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        self._set_fields(db_obj, obj_in)
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
+    def _reload(self, db_session: Session, db_obj: ModelType, profile: Optional[str]) -> ModelType:
+        """
+        `db_obj` after a commit, reloaded with what `profile` loads eagerly, so
+        the response serializes the relationships it nests without lazy loads
+        """
+        return self._query(db_session, profile).filter(self.model.uid == db_obj.uid).populate_existing().one()
+
     def remove(self, db_session: Session, *, uid: int) -> ModelType:
         obj = db_session.query(self.model).get(uid)
         db_session.delete(obj)
         db_session.commit()
+        self._invalidate_counts(obj)
         return obj
@@ -0,0 +1,165 @@
+"""
+Column projections derived from pydantic response schemas.
+
+A query projected on a schema loads only the columns the schema serializes,
+for the model itself and for every relationship the schema nests, plus the
+primary and foreign keys the ORM needs to load those relationships.
+
+Row projections go further for read only listings: one flat query of
+labelled columns, nested many-to-one relationships outer joined on aliases,
+whose rows are shaped into dicts like the schema without creating any ORM
+object.
+"""
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Query, aliased, defaultload
+
+from mspt.settings.database.sqlalchemy_filters.loads import LoadOnly
+from mspt.settings.database.sqlalchemy_filters.models import Field
+
+
+# (model, schema) -> (columns of the model, load_only options of the nested relationships)
+_projections: Dict[Tuple[type, Type[BaseModel]], Tuple[List[str], list]] = {}
+
+# (model, schema) -> _RowPlan
+_row_plans: Dict[Tuple[type, Type[BaseModel]], '_RowPlan'] = {}
+
+# columns: labelled columns to select, joins: relationship attributes to outer join,
+# tree: (keys, primary key label, children) with keys [(key, column label)] and children [(name, tree)]
+_RowPlan = namedtuple('_RowPlan', 'columns joins tree')
+
+
+def apply_projection(qry: Query, model, schema: Type[BaseModel]) -> Query:
+    """Restrict `qry` on `model` to the columns `schema` serializes"""
+    key = (model, schema)
+    if key not in _projections:
+        _projections[key] = _projection(model, schema)
+    fields, nested = _projections[key]
+    return qry.options(LoadOnly({'fields': fields}).format_for_sqlalchemy(qry, model), *nested)
+
+
+def _projection(model, schema: Type[BaseModel]) -> Tuple[List[str], list]:
+    fields = _columns(model, schema)
+    nested = []
+    for path, related_model, related_schema in _relationships(model, schema, ()):
+        loader = defaultload(path[0])
+        for key in path[1:]:
+            loader = loader.defaultload(key)
+        nested.append(loader.load_only(*_columns(related_model, related_schema)))
+    return fields, nested
+
+
+def _columns(model, schema: Type[BaseModel]) -> List[str]:
+    mapper = inspect(model)
+    keys = {mapper.get_property_by_column(column).key for column in mapper.primary_key}
+    for prop in mapper.column_attrs:
+        if prop.key in schema.__fields__ or any(column.foreign_keys for column in prop.columns):
+            keys.add(prop.key)
+    return sorted(keys)
+
+
+def _relationships(model, schema: Type[BaseModel], parent_path: Tuple[str, ...]):
+    """(path, model, schema) of every relationship `schema` nests, depth first"""
+    for name, relationship, related_schema in _nested(model, schema):
+        path = parent_path + (name,)
+        related_model = relationship.mapper.class_
+        yield path, related_model, related_schema
+        yield from _relationships(related_model, related_schema, path)
+
+
+def _nested(model, schema: Type[BaseModel]):
+    """(name, relationship, schema) of the relationships `schema` nests directly"""
+    relationships = inspect(model).relationships
+    for name, field in schema.__fields__.items():
+        # field.type_ is the item type for List[...] fields
+        related_schema = field.type_
+        if name in relationships and isinstance(related_schema, type) and issubclass(related_schema, BaseModel):
+            yield name, relationships[name], related_schema
+
+
+def apply_row_projection(qry: Query, model, schema: Type[BaseModel], extra_columns: Sequence[str] = ()) -> Query:
+    """
+    `qry` on `model` turned into a query of the labelled columns `schema`
+    needs, see shape_rows. Filters and ordering of `qry` are kept. Columns of
+    `model` are labelled with their keys, `extra_columns` are added the same
+    way (e.g. a keyset pagination sort column the schema does not serialize).
+    """
+    plan = _row_plan(model, schema)
+    root_keys = {key for key, _ in plan.tree[0]}
+    extra = [
+        Field(model, name).get_sqlalchemy_field().label(name) for name in extra_columns if name not in root_keys
+    ]
+    qry = qry.with_entities(*plan.columns, *extra)
+    for join in plan.joins:
+        qry = qry.outerjoin(join)
+    return qry
+
+
+def shape_rows(rows: Iterable[Sequence[Any]], model, schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    Rows of an apply_row_projection query as nested dicts. Columns are found
+    by label, whatever else the query selects and in whichever order.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    # labels are resolved to positions once, every row of a result has the same keys
+    positions = {label: index for index, label in enumerate(rows[0].keys())}
+    tree = _positioned(_row_plan(model, schema).tree, positions)
+    return [_shape(tree, row) for row in rows]
+
+
+def _row_plan(model, schema: Type[BaseModel]) -> _RowPlan:
+    key = (model, schema)
+    if key not in _row_plans:
+        columns, joins = [], []
+        tree = _row_node(model, model, schema, '', columns, joins)
+        _row_plans[key] = _RowPlan(columns, joins, tree)
+    return _row_plans[key]
+
+
+def _row_node(entity, model, schema: Type[BaseModel], prefix: str, columns: list, joins: list):
+    mapper = inspect(model)
+    primary_key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    keys = []
+    for key in _columns(model, schema):
+        keys.append((key, prefix + key))
+        columns.append(getattr(entity, key).label(prefix + key))
+    pk_label = prefix + primary_key
+
+    children = []
+    for name, relationship, related_schema in _nested(model, schema):
+        if relationship.uselist:
+            raise ValueError(f"{model.__name__}.{name} is a collection, row projections only nest many-to-one relationships")
+        alias = aliased(relationship.mapper.class_)
+        joins.append(getattr(entity, name).of_type(alias))
+        child = _row_node(alias, relationship.mapper.class_, related_schema, f"{prefix}{name}__", columns, joins)
+        children.append((name, child))
+    return keys, pk_label, children
+
+
+def _positioned(node, positions: Dict[str, int]):
+    """`node` with row indexes in place of its labels"""
+    keys, pk_label, children = node
+    try:
+        return (
+            [(key, positions[label]) for key, label in keys],
+            positions[pk_label],
+            [(name, _positioned(child, positions)) for name, child in children],
+        )
+    except KeyError as exc:
+        raise ValueError(f"Rows miss the column {exc}, are they from apply_row_projection?") from None
+
+
+def _shape(node, row: Sequence[Any]) -> Optional[Dict[str, Any]]:
+    keys, pk_index, children = node
+    if row[pk_index] is None:
+        # nothing on the other side of the outer join
+        return None
+    obj = {key: row[index] for key, index in keys}
+    for name, child in children:
+        obj[name] = _shape(child, row)
+    return obj
@@ -1,14 +1,35 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from pydantic import ValidationError
+from sqlalchemy import Float, case, cast, func, literal_column, or_, text, tuple_
+from sqlalchemy.orm import Query, Session
+from databases.core import Connection
 from fastapi.encoders import jsonable_encoder
 
 from mspt.apps.mspt import models
 from mspt.apps.mspt import schemas
 from mspt.settings.security import verify_password, get_password_hash
-from mspt.apps.mixins.crud import CRUDMIXIN
+from mspt.apps.mixins.crud import CRUDMIXIN, PROFILE_DETAIL, PROFILE_LIST
+from mspt.settings.database.mixins import JOINED, SELECTIN
+
+
+# Loader profiles, see CRUDMIXIN.loader_profiles. Many-to-one relations are
+# joined, owners and collections come with a SELECT ... IN per level.
+_OWNER = {'owner': SELECTIN}
+_WITH_OWNER = {PROFILE_LIST: _OWNER, PROFILE_DETAIL: _OWNER}
+_STUDYITEM = {'instrument': (JOINED, _OWNER), 'style': (JOINED, _OWNER)}
+_ATTRIBUTE = {'studyitems': (SELECTIN, _STUDYITEM)}
+_TRADE = {
+    'owner': SELECTIN,
+    'instrument': (JOINED, _OWNER),
+    'strategy': (JOINED, _OWNER),
+    'style': (JOINED, _OWNER),
+}
 
 
 class CRUDInstrument(CRUDMIXIN[models.Instrument, schemas.InstrumentCreate, schemas.InstrumentUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.Instrument}
+
     def get_by_name_owner(self, db_session: Session, *, name: str, owner_uid: int) -> Optional[models.Instrument]:
         name = name.upper()
         result = db_session.query(models.Instrument).filter(models.Instrument.name == name, models.Instrument.owner_uid == owner_uid).first()
@@ -17,6 +38,9 @@ class CRUDInstrument(CRUDMIXIN[models.Instrument, schemas.InstrumentCreate, sche
 instrument = CRUDInstrument(models.Instrument)
 
 class CRUDStyle(CRUDMIXIN[models.Style, schemas.StyleCreate, schemas.StyleUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.Style}
+
     def get_by_name(self, db_session: Session, *, name: str) -> Optional[models.Style]:
         result = db_session.query(models.Style).filter(models.Style.name == name).first()
         return result
@@ -24,15 +48,83 @@ class CRUDStyle(CRUDMIXIN[models.Style, schemas.StyleCreate, schemas.StyleUpdate
 style = CRUDStyle(models.Style)
 
 class CRUDStrategy(CRUDMIXIN[models.Strategy, schemas.StrategyCreate, schemas.StrategyUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.Strategy}
+
     def get_by_name_owner(self, db_session: Session, *, name:str, owner_uid:int) -> Optional[models.Strategy]:
         result = db_session.query(models.Strategy).filter(models.Strategy.name == name, models.Strategy.owner_uid == owner_uid).first()
         return result
 
+    def get_paginated_multi_with_stats(self, db_session: Session, *, request, page=1, size=10, shared=False, owner_uid=None, sort_on='uid', sort_order='asc', cursor=None) -> Dict[str, Any]:
+        qry = self._listing_query(
+            db_session, 
+            shared=shared, 
+            owner_uid=owner_uid, 
+            sort_on=sort_on, 
+            sort_order=sort_order,
+            profile=PROFILE_LIST
+        )
+        paginated = self._paginate(
+            self._with_stats(db_session, qry), 
+            request=request, 
+            page=page, 
+            size=size, 
+            shared=shared, 
+            sort_on=sort_on, 
+            sort_order=sort_order,
+            cursor=cursor,
+            count_key=self._count_key(shared=shared, owner_uid=owner_uid)
+        )
+        paginated['items'] = [_strategy_with_stats(*row) for row in paginated['items']]
+        return paginated
+
+    def get_with_stats(self, db_session: Session, *, uid: int) -> Optional[Dict[str, Any]]:
+        qry = self._query(db_session, PROFILE_DETAIL).filter(self.model.uid == uid)
+        row = self._with_stats(db_session, qry).first()
+        return _strategy_with_stats(*row) if row else None
+
+    def _with_stats(self, db_session: Session, qry):
+        """
+        Add per-strategy trade counts to `qry`, aggregated in the database by
+        subqueries correlated to each strategy row, so only the trades of the
+        strategies returned are read (through ix_trade_strategy_uid)
+        """
+        won = func.sum(case([(models.Trade.outcome.is_(True), 1)], else_=0))
+        trades = db_session.query(models.Trade).filter(models.Trade.strategy_uid == self.model.uid)
+        return qry.add_columns(
+            trades.with_entities(func.count(models.Trade.uid)).correlate(self.model).as_scalar(),
+            func.coalesce(trades.with_entities(won).correlate(self.model).as_scalar(), 0),
+        )
+
 strategy = CRUDStrategy(models.Strategy)
 
 
+def _strategy_with_stats(strategy: models.Strategy, total_trades: int, won: int) -> Dict[str, Any]:
+    lost: int = total_trades - won
+    if total_trades != 0:
+        win_rate = (won / total_trades) * 100
+    else:
+        win_rate = 0
+
+    return {
+        'uid': strategy.uid,
+        'name': strategy.name,
+        'owner_uid': strategy.owner_uid,
+        'owner': strategy.owner,
+        'description': strategy.description,
+        'total_trades': total_trades,
+        'won_trades': won,
+        'lost_trades': lost,
+        'win_rate': win_rate,
+        'public': strategy.public,
+    }
+
+
 class CRUDTrade(CRUDMIXIN[models.Trade, schemas.TradeCreate, schemas.TradeUpdate]):
-    def create(self, db_session: Session, *, obj_in: schemas.TradeCreate) -> models.Trade:
+    loader_profiles = {PROFILE_LIST: _TRADE, PROFILE_DETAIL: _TRADE}
+    profile_schemas = {PROFILE_LIST: schemas.Trade}
+
+    def create(self, db_session: Session, *, obj_in: schemas.TradeCreate, profile: Optional[str] = PROFILE_DETAIL) -> models.Trade:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         # parse uid's as integers
@@ -46,31 +138,257 @@ class CRUDTrade(CRUDMIXIN[models.Trade, schemas.TradeCreate, schemas.TradeUpdate
         ###
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
     def update(
-        self, db_session: Session, *, db_obj: models.Trade, obj_in: schemas.TradeUpdate
+        self, db_session: Session, *, db_obj: models.Trade, obj_in: schemas.TradeUpdate, profile: Optional[str] = PROFILE_DETAIL
     ) -> models.Trade:
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(skip_defaults=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        self._set_fields(db_obj, obj_in)
         # reset relationship mode linkages
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj.instrument = db_session.query(models.Instrument).get(obj_in_data["instrument_uid"])
-        db_obj.strategy = db_session.query(models.Strategy).get(obj_in_data["strategy_uid"])
-        db_obj.style = db_session.query(models.Style).get(obj_in_data["style_uid"])
+        db_obj.instrument = db_session.query(models.Instrument).get(obj_in.instrument_uid)
+        db_obj.strategy = db_session.query(models.Strategy).get(obj_in.strategy_uid)
+        db_obj.style = db_session.query(models.Style).get(obj_in.style_uid)
         ##
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
+    def get_statistics(self, db_session: Session, *, owner_uid: int) -> Dict[str, Any]:
+        """
+        Aggregate win rate, risk/reward and pips for every breakdown in one
+        GROUPING SETS query. Only aggregated rows leave the database.
+        """
+        rows = _statistics_query(owner_uid=owner_uid).with_session(db_session).all()
+        return _statistics_from_rows(rows)
+
+    async def get_statistics_async(self, db: Connection, *, owner_uid: int) -> Dict[str, Any]:
+        rows = await db.fetch_all(_statistics_query(owner_uid=owner_uid).statement)
+        return _statistics_from_rows(rows)
+
+    def export_query(self, db_session: Session, *, owner_uid: int) -> Query:
+        """
+        Flat export rows of the user's trades, related objects reduced to their
+        names. Streamed from a server side cursor, see trade_io.export_rows.
+        """
+        trade = self.model
+        return (
+            db_session.query(*[_export_column(name) for name in EXPORT_COLUMNS])
+            .outerjoin(models.Instrument, trade.instrument_uid == models.Instrument.uid)
+            .outerjoin(models.Strategy, trade.strategy_uid == models.Strategy.uid)
+            .outerjoin(models.Style, trade.style_uid == models.Style.uid)
+            .filter(trade.owner_uid == owner_uid)
+            .order_by(trade.uid)
+        )
+
+    def import_trades(
+        self, db_session: Session, *, rows: Iterable[Tuple[int, Any]], owner_uid: int, chunk_size: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Validate and insert parsed import rows (line number, dict or parse error)
+        in chunks of multi-row INSERTs within one transaction. Instrument,
+        strategy and style may be given by uid or by name, names are resolved
+        against the user's own and the public ones. Returns the import report.
+        """
+        lookups = {
+            relation: _name_lookup(db_session, model, owner_uid)
+            for relation, model in (
+                ('instrument', models.Instrument), ('strategy', models.Strategy), ('style', models.Style)
+            )
+        }
+        table = self.model.__table__
+        imported = 0
+        errors = []
+        chunk = []
+        for line_num, row in rows:
+            if isinstance(row, str):
+                errors.append({'row': line_num, 'errors': [row]})
+                continue
+            values, row_errors = _import_values(row, lookups, owner_uid)
+            if row_errors:
+                errors.append({'row': line_num, 'errors': row_errors})
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                db_session.execute(table.insert().values(chunk))
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            db_session.execute(table.insert().values(chunk))
+            imported += len(chunk)
+        db_session.commit()
+        if imported:
+            self._invalidate_counts({'owner_uid': owner_uid})
+        return {'imported': imported, 'failed': len(errors), 'errors': errors}
+
 trade = CRUDTrade(models.Trade)
 
+
+# Export column order, instrument/strategy/style as names so exports import back as they are
+EXPORT_COLUMNS = (
+    'uid', 'date', 'instrument', 'strategy', 'style', 'position', 'outcome', 'status',
+    'pips', 'rr', 'description', 'sl', 'tp', 'tp_reached', 'tp_exceeded', 'full_stop',
+    'entry_price', 'sl_price', 'tp_price', 'scaled_in', 'scaled_out', 'correlated_position', 'public',
+)
+
+_EXPORT_RELATIONS = {
+    'instrument': models.Instrument,
+    'strategy': models.Strategy,
+    'style': models.Style,
+}
+
+
+def _export_column(name: str):
+    if name in _EXPORT_RELATIONS:
+        return _EXPORT_RELATIONS[name].name.label(name)
+    return getattr(models.Trade, name)
+
+
+def _name_lookup(db_session: Session, model, owner_uid: int) -> Tuple[Dict[str, int], set]:
+    """
+    Lower cased name to uid of the rows usable by `owner_uid`, own rows win
+    over public ones, plus the set of those uids
+    """
+    rows = (
+        db_session.query(model.name, model.uid, model.owner_uid)
+        .filter(or_(model.owner_uid == owner_uid, model.public == True))  # noqa: E712
+        .all()
+    )
+    lookup = {}
+    for name, uid, row_owner_uid in rows:
+        if name is None:
+            continue
+        key = name.strip().lower()
+        if key not in lookup or row_owner_uid == owner_uid:
+            lookup[key] = uid
+    return lookup, {uid for _, uid, _ in rows}
+
+
+def _import_values(row: Dict[str, Any], lookups: Dict[str, Tuple[Dict[str, int], set]], owner_uid: int):
+    """Insert values for one import row, or the reasons it was rejected"""
+    row = dict(row)
+    errors = []
+    for relation, (lookup, uids) in lookups.items():
+        name = row.pop(relation, None)
+        uid_key = f"{relation}_uid"
+        if row.get(uid_key) is not None:
+            try:
+                uid = int(row[uid_key])
+            except (TypeError, ValueError):
+                errors.append(f"{uid_key}: not an integer")
+                continue
+            if uid not in uids:
+                errors.append(f"{uid_key}: unknown {relation} {uid}")
+            row[uid_key] = uid
+        elif name is not None:
+            uid = lookup.get(str(name).strip().lower())
+            if uid is None:
+                errors.append(f"{relation}: unknown {relation} {name!r}")
+            row[uid_key] = uid
+        else:
+            errors.append(f"{relation}: a name or {uid_key} is required")
+    if errors:
+        return None, errors
+
+    try:
+        trade_in = schemas.TradeCreate(**row)
+    except ValidationError as exc:
+        return None, [f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in exc.errors()]
+    values = trade_in.dict()
+    values['owner_uid'] = owner_uid
+    return values, []
+
+
+# Breakdown name for each combination of grouped dimensions
+# (instrument, strategy, style, position) in the GROUPING SETS query.
+_STATISTICS_BREAKDOWNS = {
+    (False, False, False, False): 'overall',
+    (True, False, False, False): 'by_instrument',
+    (False, True, False, False): 'by_strategy',
+    (False, False, True, False): 'by_style',
+    (False, False, False, True): 'by_position',
+    (True, True, False, False): 'instrument_by_strategy',
+    (True, False, True, False): 'instrument_by_style',
+    (True, False, False, True): 'instrument_by_position',
+}
+
+
+def _statistics_query(*, owner_uid: int) -> Query:
+    instrument = (models.Instrument.uid, models.Instrument.name)
+    strategy = (models.Strategy.uid, models.Strategy.name)
+    style = (models.Style.uid, models.Style.name)
+    position = models.Trade.position
+
+    # constants are inlined, asyncpg sends bind parameters untyped and the server
+    # would take the CASE results for text and 100.0 for a bigint
+    won = func.coalesce(func.sum(case([(models.Trade.outcome.is_(True), literal_column('1'))], else_=literal_column('0'))), 0)
+    total = func.count(models.Trade.uid)
+
+    return Query([
+        func.grouping(models.Instrument.uid).label('g_instrument'),
+        func.grouping(models.Strategy.uid).label('g_strategy'),
+        func.grouping(models.Style.uid).label('g_style'),
+        func.grouping(position).label('g_position'),
+        models.Instrument.uid.label('instrument_uid'),
+        models.Instrument.name.label('instrument'),
+        models.Strategy.uid.label('strategy_uid'),
+        models.Strategy.name.label('strategy'),
+        models.Style.uid.label('style_uid'),
+        models.Style.name.label('style'),
+        position.label('position'),
+        total.label('total_trades'),
+        won.label('won_trades'),
+        cast(func.coalesce(literal_column('100.0') * won / func.nullif(total, 0), 0), Float).label('win_rate'),
+        cast(func.avg(models.Trade.rr), Float).label('avg_rr'),
+        cast(func.avg(models.Trade.pips), Float).label('avg_pips'),
+        cast(func.avg(case([(models.Trade.outcome.is_(True), models.Trade.pips)])), Float).label('avg_pips_won'),
+        cast(func.avg(case([(models.Trade.outcome.is_(False), models.Trade.pips)])), Float).label('avg_pips_lost'),
+        func.coalesce(func.sum(models.Trade.pips), 0).label('total_pips'),
+    ]).select_from(models.Trade).join(
+        models.Instrument, models.Trade.instrument_uid == models.Instrument.uid
+    ).join(
+        models.Strategy, models.Trade.strategy_uid == models.Strategy.uid
+    ).join(
+        models.Style, models.Trade.style_uid == models.Style.uid
+    ).filter(
+        # open trades have no outcome yet, they would count as lost
+        models.Trade.owner_uid == owner_uid, models.Trade.status.is_(False)
+    ).group_by(
+        func.grouping_sets(
+            text('()'),
+            tuple_(*instrument),
+            tuple_(*strategy),
+            tuple_(*style),
+            position,
+            tuple_(*instrument, *strategy),
+            tuple_(*instrument, *style),
+            tuple_(*instrument, position),
+        )
+    )
+
+
+def _statistics_from_rows(rows) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {name: [] for name in _STATISTICS_BREAKDOWNS.values()}
+    stats['overall'] = {}
+    for row in rows:
+        row = row._asdict() if hasattr(row, '_asdict') else dict(row)
+        grouped = tuple(not row.pop(key) for key in ('g_instrument', 'g_strategy', 'g_style', 'g_position'))
+        breakdown = _STATISTICS_BREAKDOWNS[grouped]
+        row['lost_trades'] = row['total_trades'] - row['won_trades']
+        if breakdown == 'overall':
+            stats['overall'] = row
+        else:
+            stats[breakdown].append(row)
+    return stats
+
+
 class CRUDTradingPlan(CRUDMIXIN[models.TradingPlan, schemas.TradingPlanCreate, schemas.TradingPlanUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.TradingPlan}
+
     def get_by_name_owner(self, db_session: Session, *, name: str, owner_uid:int) -> Optional[models.TradingPlan]:
         result = db_session.query(models.TradingPlan).filter(models.TradingPlan.name == name, models.TradingPlan.owner_uid == owner_uid).first()
         return result
@@ -79,6 +397,9 @@ trading_plan = CRUDTradingPlan(models.TradingPlan)
 
 
 class CRUDTask(CRUDMIXIN[models.Task, schemas.TaskCreate, schemas.TaskUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.Task}
+
     def get_by_name(self, db_session: Session, *, name: str) -> Optional[models.Task]:
         result = db_session.query(models.Task).filter(models.Task.name == name).first()
         return result
@@ -87,6 +408,9 @@ task = CRUDTask(models.Task)
 
 
 class CRUDStudy(CRUDMIXIN[models.Study, schemas.StudyCreate, schemas.StudyUpdate]):
+    loader_profiles = _WITH_OWNER
+    profile_schemas = {PROFILE_LIST: schemas.Study}
+
     def get_by_name(self, db_session: Session, *, name: str) -> Optional[models.Study]:
         result = db_session.query(models.Study).filter(models.Study.name == name).first()
         return result
@@ -94,14 +418,21 @@ class CRUDStudy(CRUDMIXIN[models.Study, schemas.StudyCreate, schemas.StudyUpdate
 study = CRUDStudy(models.Study)
 
 class CRUDStudyItem(CRUDMIXIN[models.StudyItem, schemas.StudyItemCreate, schemas.StudyItemUpdate]):
+    # detail is StudyItemWithAttrs: attributes, and the study items of those
+    loader_profiles = {
+        PROFILE_LIST: _STUDYITEM,
+        PROFILE_DETAIL: dict(_STUDYITEM, attributes=(SELECTIN, _ATTRIBUTE)),
+    }
+    profile_schemas = {PROFILE_LIST: schemas.StudyItem}
+
     def get_by_name(self, db_session: Session, *, name: str) -> Optional[models.StudyItem]:
         result = db_session.query(models.StudyItem).filter(models.StudyItem.name == name).first()
         return result
 
-    def get_multi_by_study(self, db_session: Session, *, study_uid: int, skip=0, limit=100) -> List[models.StudyItem]:
-        return db_session.query(self.model).filter(models.StudyItem.study_uid == study_uid).offset(skip).limit(limit).all()
+    def get_multi_by_study(self, db_session: Session, *, study_uid: int, skip=0, limit=100, profile: Optional[str] = PROFILE_LIST) -> List[models.StudyItem]:
+        return self._query(db_session, profile).filter(models.StudyItem.study_uid == study_uid).offset(skip).limit(limit).all()
 
-    def create(self, db_session: Session, *, obj_in: schemas.StudyItemCreateWithAttrs) -> models.StudyItem:
+    def create(self, db_session: Session, *, obj_in: schemas.StudyItemCreateWithAttrs, profile: Optional[str] = PROFILE_DETAIL) -> models.StudyItem:
         obj_in_data = jsonable_encoder(obj_in)
         attrs = obj_in_data['attributes']
         del obj_in_data['attributes']
@@ -120,45 +451,42 @@ class CRUDStudyItem(CRUDMIXIN[models.StudyItem, schemas.StudyItemCreate, schemas
         ###
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
-    def update( self, db_session: Session, *, db_obj: models.StudyItem, obj_in: schemas.StudyItemUpdate) -> models.StudyItem:
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(skip_defaults=True)
-        for field in obj_data:
-            if field in update_data:
-                try:
-                    setattr(db_obj, field, update_data[field])
-                except Exception as e:
-                    # Attributes data wil he handles on ite own
-                    pass
+    def update( self, db_session: Session, *, db_obj: models.StudyItem, obj_in: schemas.StudyItemUpdateWithAttrs, profile: Optional[str] = PROFILE_DETAIL) -> models.StudyItem:
+        # attributes are a relationship, not among the copied fields, they are reset below
+        self._set_fields(db_obj, obj_in)
         # reset relationship mode linkages
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj.instrument = db_session.query(models.Instrument).get(obj_in_data["instrument_uid"])
-        db_obj.style = db_session.query(models.Style).get(obj_in_data["style_uid"])
+        db_obj.instrument = db_session.query(models.Instrument).get(obj_in.instrument_uid)
+        db_obj.style = db_session.query(models.Style).get(obj_in.style_uid)
         ##
         db_obj.attributes.clear()
-        for _attr in obj_in_data['attributes']:
-            attr = db_session.query(models.Attribute).get(_attr["uid"])
-            if not attr in obj_data['attributes']:
+        for _attr in obj_in.attributes:
+            attr = db_session.query(models.Attribute).get(_attr.uid)
+            if attr is not None and attr not in db_obj.attributes:
                 db_obj.attributes.append(attr)
         ##
         db_session.add(db_obj)
         db_session.commit()
-        db_session.refresh(db_obj)
+        db_obj = self._reload(db_session, db_obj, profile)
+        self._invalidate_counts(db_obj)
         return db_obj
 
 studyitem = CRUDStudyItem(models.StudyItem)
 
 
 class CRUDAttribute(CRUDMIXIN[models.Attribute, schemas.AttributeCreate, schemas.AttributeUpdate]):
+    loader_profiles = {PROFILE_LIST: _ATTRIBUTE, PROFILE_DETAIL: _ATTRIBUTE}
+    profile_schemas = {PROFILE_LIST: schemas.Attribute}
+
     def get_by_name(self, db_session: Session, *, name: str) -> Optional[models.Attribute]:
         result = db_session.query(models.Attribute).filter(models.Attribute.name == name).first()
         return result
 
-    def get_multi_by_study(self, db_session: Session, *, study_uid: int, skip=0, limit=100) -> List[models.Attribute]:
-        return db_session.query(self.model).filter(models.Attribute.study_uid == study_uid).offset(skip).limit(limit).all()
+    def get_multi_by_study(self, db_session: Session, *, study_uid: int, skip=0, limit=100, profile: Optional[str] = PROFILE_LIST) -> List[models.Attribute]:
+        return self._query(db_session, profile).filter(models.Attribute.study_uid == study_uid).offset(skip).limit(limit).all()
 
 
 attribute = CRUDAttribute(models.Attribute)
\ No newline at end of file
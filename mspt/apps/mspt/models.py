@@ -8,6 +8,8 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     DateTime,
+    JSON,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -34,9 +36,14 @@ class BaseImage(DBModel):
     signature = Column(String)
     version = Column(String)
     version_uid = Column(String)
+    # [{width, format, url, public_uid}] resized copies, see apps.mspt.variants
+    variants = Column(JSON)
+    # sha256 of the uploaded file, images with the same hash share one stored asset
+    content_hash = Column(String(64), index=True)
 
 
 class StrategyImage(BaseImage):
+    __table_args__ = (UniqueConstraint('strategy_uid', 'content_hash'),)
     strategy_uid = Column(Integer, ForeignKey("strategy.uid", ondelete="CASCADE"), nullable=False)
     strategy = relationship("Strategy", backref="images")
 
@@ -48,6 +55,7 @@ class StrategyImage(BaseImage):
 
 
 class TradeImage(BaseImage):
+    __table_args__ = (UniqueConstraint('trade_uid', 'content_hash'),)
     trade_uid = Column(Integer, ForeignKey("trade.uid", ondelete="CASCADE"), nullable=False)
     trade = relationship("Trade", backref="images")
 
@@ -79,21 +87,23 @@ class Style(BaseModel):
     public = Column(Boolean(), default=False)
 
 
+# Relationships load lazily, queries pick what to eager load through the
+# loader profiles of their CRUD object (see apps.mixins.crud.CRUDMIXIN)
 class Trade(DBModel):    
-    owner_uid = Column(Integer, ForeignKey("user.uid", ondelete="CASCADE"), nullable=False)
+    owner_uid = Column(Integer, ForeignKey("user.uid", ondelete="CASCADE"), nullable=False, index=True)
     owner = relationship(User, backref="trades")
     date = Column(DateTime)
     instrument_uid = Column(Integer, ForeignKey("instrument.uid", ondelete="RESTRICT"), nullable=False)
-    instrument = relationship("Instrument", backref="trades", lazy="joined")
-    strategy_uid = Column(Integer, ForeignKey("strategy.uid", ondelete="RESTRICT"), nullable=False)
-    strategy = relationship("Strategy", backref="trades", lazy="joined")
+    instrument = relationship("Instrument", backref="trades")
+    strategy_uid = Column(Integer, ForeignKey("strategy.uid", ondelete="RESTRICT"), nullable=False, index=True)
+    strategy = relationship("Strategy", backref="trades")
     position = Column(Boolean(), default=True)  # True == Long Trade, False == Short Trade
     outcome = Column(Boolean(), default=False)  # True == Protibale Trade, False == Losing Trade
     status = Column(Boolean(), default=False)  # True == Running / Open Trade, False == Closed Trade
     pips = Column(Integer)
     rr = Column(Float)
     style_uid = Column(Integer, ForeignKey("style.uid", ondelete="RESTRICT"), nullable=False)
-    style = relationship("Style", backref="trades", lazy="joined")
+    style = relationship("Style", backref="trades")
     description = Column(String)
     # images = relationship("TradeImage", back_populates="image")
     sl = Column(Integer) # Slop loss initial
@@ -136,6 +146,7 @@ class Study(BaseModel):
 
 
 class StudyItemImage(BaseImage):
+    __table_args__ = (UniqueConstraint('studyitem_uid', 'content_hash'),)
     studyitem_uid = Column(Integer, ForeignKey("studyitem.uid", ondelete="CASCADE"), nullable=False)
     studyitem = relationship("StudyItem", backref="images", lazy="joined")
 
@@ -148,17 +159,17 @@ class StudyItemImage(BaseImage):
 
 class StudyItem(BaseModel):
     study_uid = Column(Integer, ForeignKey("study.uid", ondelete="RESTRICT"), nullable=False)
-    study = relationship("Study", backref="studyitems", lazy="joined")
+    study = relationship("Study", backref="studyitems")
     instrument_uid = Column(Integer, ForeignKey("instrument.uid", ondelete="RESTRICT"), nullable=True)
-    instrument = relationship("Instrument", backref="studyitems", lazy="joined")
+    instrument = relationship("Instrument", backref="studyitems")
     position = Column(Boolean(), default=True)  # True == Long Trade, False == Short Trade
     outcome = Column(Boolean(), default=False)  # True == Pfotibale Trade, False == Losing Trade
     pips = Column(Integer)
     rrr = Column(Float)
     style_uid = Column(Integer, ForeignKey("style.uid", ondelete="RESTRICT"), nullable=True)
-    style = relationship("Style", backref="studyitems", lazy="joined")
+    style = relationship("Style", backref="studyitems")
     date = Column(DateTime)
-    attributes = relationship("Attribute", secondary=lambda: StudyItemAttribute.__table__, lazy="joined")
+    attributes = relationship("Attribute", secondary=lambda: StudyItemAttribute.__table__)
     public = Column(Boolean(), default=False)
 
 
@@ -169,8 +180,8 @@ class Attribute(BaseModel):
     Study: One SMA
     Attributes: H1/D1 Config, H4/W1 Config"""
     study_uid = Column(Integer, ForeignKey("study.uid", ondelete="RESTRICT"), nullable=False)
-    study = relationship("Study", backref="attributes", lazy="joined")
-    studyitems = relationship("StudyItem", secondary=lambda: StudyItemAttribute.__table__, lazy="joined")    
+    study = relationship("Study", backref="attributes")
+    studyitems = relationship("StudyItem", secondary=lambda: StudyItemAttribute.__table__)    
     public = Column(Boolean(), default=False)
 
 
@@ -3,12 +3,15 @@ from fastapi import (
     APIRouter,
     Depends,
     File,
+    HTTPException,
     UploadFile,
     Form,
 )
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from mspt.apps.mspt import utils
+from mspt.apps.mspt import schemas, utils
+from mspt.apps.mspt.uploads import upload_queue
 from mspt.settings.database import get_db
 from mspt.utils.create_dirs import resolve_media_dirs_for
 
@@ -16,7 +19,7 @@ router = APIRouter()
 db_session = Session()
 
 
-@router.post("/uploads-handler")
+@router.post("/uploads-handler", response_model=schemas.UploadJob, status_code=202)
 async def handle_file_uploads(
         db: Session = Depends(get_db),
         files: List[UploadFile] = File(...),
@@ -24,33 +27,26 @@ async def handle_file_uploads(
         tags: str = Form(...),
         caption: str = Form(...)
     ):
+    """
+    Stage the files and queue them for upload, poll /upload-jobs/{job_uid} for the outcome.
+    """
     parent, parent_uid = parent.split('-')
-    media_dir = resolve_media_dirs_for(parent)
-    images = []
+    if parent not in utils.IMAGE_PARENTS:
+        raise HTTPException(status_code=400, detail=f"Unknown Parent: {parent}")
+    # fail fast instead of staging files for a parent that does not exist
+    await run_in_threadpool(utils.get_parent_or_404, db, parent, parent_uid)
+    job = await upload_queue.submit(
+        files, parent=parent, parent_uid=parent_uid, tags=tags, caption=caption
+    )
+    return job
 
-    for _file in files:   
-        file_path = media_dir + _file.filename
-        resp = await utils.save_or_upload(
-            file_path=file_path, 
-            img_file=_file, 
-            tags=tags,
-            caption=caption,
-            parent=parent,
-            parent_uid=parent_uid,
-        )
-        utils.persist_image_metadata(
-            db=db, 
-            parent=parent,
-            parent_uid=parent_uid, 
-            location=resp.get('url', None),
-            public_uid = resp.get('public_uid', None),
-            asset_uid = resp.get('asset_uid', None),
-            signature = resp.get('signature', None),
-            version = resp.get('version', None),
-            version_uid = resp.get('version_uid', None)
-        )
-        images = utils.get_image_response(db=db, parent=parent, parent_uid=parent_uid)
-    return images
+
+@router.get("/upload-jobs/{job_uid}", response_model=schemas.UploadJob)
+async def read_upload_job(job_uid: str):
+    job = upload_queue.get(job_uid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
 
 
 @router.get("/fetch-files/{parent_uidentifier}")
@@ -10,6 +10,7 @@ from mspt.apps.mspt import (
     schemas,
     crud
 )
+from mspt.apps.mixins.crud import PROFILE_LIST
 from mspt.apps.users import models as user_models
 from mspt.settings.database import get_db
 from mspt.settings.security import (
@@ -30,7 +31,7 @@ def read_instruments(
     """
     Retrieve instruments.
     """
-    instruments = crud.instrument.get_multi_for_user(db, owner_uid=current_user.uid, skip=skip, limit=limit)
+    instruments = crud.instrument.get_multi_for_user(db, owner_uid=current_user.uid, skip=skip, limit=limit, profile=PROFILE_LIST)
     return instruments
 
 
@@ -2,52 +2,37 @@ from fastapi import (
     APIRouter,
     Depends,
 )
-from sqlalchemy.orm import Session
-
+from databases.core import Connection
 
+from mspt.apps.mspt import (
+    schemas,
+    crud,
+)
 from mspt.apps.users import models as user_models
-from mspt.settings.database import get_db
+from mspt.settings.database import get_async_db
 from mspt.settings.security import (
     get_current_active_user
 )
 
 router = APIRouter()
-db_session = Session()
 
 
-@router.get("/peformance-measures")
-def trade_stats(
-        db: Session = Depends(get_db),
+@router.get("/peformance-measures", response_model=schemas.TradeStatistics)
+async def trade_stats(
+        db: Connection = Depends(get_async_db),
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
     Calculate Trading Statistics.
-    """
-
-    # 1. Stategy Win Rates
-    # overal peformance
-    # by pair
-    # by style
-    # by position type
 
-    # 2. RiskReward
-    # overal peformance
-    # by pair
-    # by style
-    # by strategy
+    Every breakdown reports total/won/lost trades, win rate, average
+    risk/reward and average pips (overall, won and lost) of the closed
+    trades, open trades are left out until they are closed:
 
-    # 3. Average Pips Lost/Gained
-    # overal peformance
-    # by pair
-    # by strategy
-    # by style
-
-    # 3. Intsrument Peformances
-    # overal peformance
-    # by strategy
-    # by style
-    # by position type
-
-    # 2. Other Stats
-
-    return {}
+    * `overall`: overall peformance
+    * `by_instrument`, `by_strategy`, `by_style`, `by_position`
+    * `instrument_by_strategy`, `instrument_by_style`, `instrument_by_position`:
+      instrument peformances
+    """
+    stats = await crud.trade.get_statistics_async(db, owner_uid=current_user.uid)
+    return stats
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Optional
 from fastapi import (
     APIRouter,
     Depends,
@@ -10,7 +10,6 @@ from sqlalchemy.orm import Session
 
 from mspt.apps.mspt import (
     schemas,
-    models,
     crud,
 )
 from mspt.apps.users import models as user_models
@@ -23,43 +22,6 @@ router = APIRouter()
 db_session = Session()
 
 
-def _calc_stats(strategy: models.Strategy):
-    won: int = 0
-    total_trades: int = len(strategy.trades)
-    for trade in strategy.trades:
-        if trade.outcome:
-            won += 1
-    lost: int = total_trades - won
-    if total_trades != 0:
-        win_rate = (won / total_trades) * 100
-    else:
-        win_rate = 0
-
-    # Build strategy obj and push
-    _strategy = {
-        'uid': strategy.uid,
-        'name': strategy.name,
-        'owner_uid': strategy.owner_uid,
-        'owner': strategy.owner,
-        'description': strategy.description,
-        'total_trades': total_trades,
-        'won_trades': won,
-        'lost_trades': lost,
-        'win_rate': win_rate,
-        'public': strategy.public,
-    }    
-    return _strategy
-
-
-def _with_strategy_stats(strategies: List = []):
-    _strategies: list = []
-    _strategy: dict = {}
-    for strategy in strategies:
-        _strategy = _calc_stats(strategy)
-        _strategies.append(_strategy)
-    return _strategies
-        
-
 @router.get("/strategy", response_model=schemas.StrategyPlusStatsPaginated)
 def read_strategies(
         *,
@@ -70,12 +32,13 @@ def read_strategies(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
     Retrieve strategies.
     """
-    strategies = crud.strategy.get_paginated_multi(
+    strategies = crud.strategy.get_paginated_multi_with_stats(
         db, 
         request=request,
         page=page, 
@@ -83,9 +46,9 @@ def read_strategies(
         owner_uid=current_user.uid,
         shared=shared,
         sort_on=sort_on,        
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
-    strategies['items'] = _with_strategy_stats(strategies['items'])
     return strategies
 
 
@@ -107,8 +70,8 @@ def create_strategy(
         )
     strategy_in.owner_uid = current_user.uid
     strategy = crud.strategy.create(db, obj_in=strategy_in)
-    _strategy = _calc_stats(strategy)
-    return _strategy
+    strategy = crud.strategy.get_with_stats(db, uid=strategy.uid)
+    return strategy
 
 
 @router.put("/strategy/{strategy_uid}", response_model=schemas.StrategyPlusStats)
@@ -129,8 +92,8 @@ def update_strategy(
             detail="This strategy does not exist in the system",
         )
     strategy = crud.strategy.update(db, db_obj=strategy, obj_in=strategy_in)
-    _strategy = _calc_stats(strategy)
-    return _strategy
+    strategy = crud.strategy.get_with_stats(db, uid=strategy.uid)
+    return strategy
 
 
 @router.delete("/strategy/{strategy_uid}", response_model=schemas.StrategyDelete)
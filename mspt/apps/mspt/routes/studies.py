@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from fastapi import (
     APIRouter,
     Depends,
@@ -12,6 +12,7 @@ from mspt.apps.mspt import (
     schemas,
     crud,
 )
+from mspt.apps.mixins.crud import PROFILE_DETAIL, PROFILE_LIST
 from mspt.apps.users import models as user_models
 from mspt.settings.database import get_db
 from mspt.settings.security import (
@@ -38,6 +39,7 @@ def read_studies(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
@@ -51,7 +53,8 @@ def read_studies(
         owner_uid=current_user.uid,
         shared=shared,
         sort_on=sort_on,        
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
     return studies
 
@@ -128,12 +131,13 @@ def read_study_items(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
     Retrieve studyitems.
     """
-    s_items = crud.studyitem.get_paginated_multi(
+    s_items = crud.studyitem.get_paginated_rows(
         db, 
         request=request,
         page=page, 
@@ -142,6 +146,7 @@ def read_study_items(
         shared=shared,
         sort_on=sort_on,        
         sort_order=sort_order,
+        cursor=cursor,
         other_filters=[{'field': 'study_uid', 'op': '==', 'value': study_uid}] if study_uid else []
     )
     return s_items
@@ -173,7 +178,7 @@ def update_studyitems(
     """
     Update an studyitems.
     """
-    studyitem = crud.studyitem.get(db, uid=studyitem_uid)
+    studyitem = crud.studyitem.get(db, uid=studyitem_uid, profile=PROFILE_DETAIL)
     if not studyitem:
         raise HTTPException(
             status_code=404,
@@ -195,7 +200,8 @@ def delete_studyitems(
     """
     Delete an studyitem.
     """
-    studyitem = crud.studyitem.get(db, uid=studyitem_uid)
+    # loaded with what the response needs, the object is detached once deleted
+    studyitem = crud.studyitem.get(db, uid=studyitem_uid, profile=PROFILE_LIST)
     if not studyitem:
         raise HTTPException(
             status_code=404,
@@ -270,7 +276,7 @@ def delete_attribute(
     """
     Delete an attr.
     """
-    attr = crud.attribute.get(db, uid=attr_uid)
+    attr = crud.attribute.get(db, uid=attr_uid, profile=PROFILE_LIST)
     if not attr:
         raise HTTPException(
             status_code=404,
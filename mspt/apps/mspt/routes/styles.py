@@ -10,6 +10,7 @@ from mspt.apps.mspt import (
     schemas,
     crud
 )
+from mspt.apps.mixins.crud import PROFILE_LIST
 from mspt.apps.users import models as user_models
 from mspt.settings.database import get_db
 from mspt.settings.security import (
@@ -32,7 +33,7 @@ def read_styles(
     """
     Retrieve styles.
     """
-    styles = crud.style.get_multi(db, skip=skip, limit=limit)
+    styles = crud.style.get_multi(db, skip=skip, limit=limit, profile=PROFILE_LIST)
     return styles
 
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from fastapi import (
     APIRouter,
     Depends,
@@ -31,6 +31,7 @@ def read_tasks(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
@@ -44,7 +45,8 @@ def read_tasks(
         owner_uid=current_user.uid,
         shared=shared,
         sort_on=sort_on,        
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
     return tasks
 
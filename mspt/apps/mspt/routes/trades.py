@@ -1,17 +1,23 @@
-from typing import List
+from typing import List, Optional
 from fastapi import (
     APIRouter,
     Depends,
+    File,
+    Form,
     HTTPException,
     Query,
-    Request
+    Request,
+    UploadFile,
 )
 from sqlalchemy.orm import Session
+from starlette.responses import StreamingResponse
 
 from mspt.apps.mspt import (
     schemas,
     crud,
+    trade_io,
 )
+from mspt.settings import config
 from mspt.apps.users import models as user_models
 from mspt.settings.database import get_db
 from mspt.settings.security import (
@@ -32,12 +38,13 @@ def read_trades(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
     Retrieve trades.
     """
-    trades = crud.trade.get_paginated_multi(
+    trades = crud.trade.get_paginated_rows(
         db, 
         request=request,
         page=page, 
@@ -45,7 +52,8 @@ def read_trades(
         owner_uid=current_user.uid,
         shared=shared,
         sort_on=sort_on,        
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
     return trades
 
@@ -66,6 +74,45 @@ def create_trade(
     return trade
 
 
+@router.post("/trade/import", response_model=schemas.TradeImportReport)
+def import_trades(
+        *,
+        db: Session = Depends(get_db),
+        file: UploadFile = File(...),
+        format: Optional[str] = Form(None),
+        current_user: user_models.User = Depends(get_current_active_user),
+):
+    """
+    Import trades from a CSV or JSON lines file (format defaults to the file extension).
+    Instrument, strategy and style are given by name or uid, rows that fail
+    validation are skipped and reported.
+    """
+    fmt = trade_io.import_format(format, file.filename)
+    rows = trade_io.read_trade_rows(file.file, fmt)
+    report = crud.trade.import_trades(
+        db, rows=rows, owner_uid=current_user.uid, chunk_size=config.TRADE_IMPORT_CHUNK_SIZE
+    )
+    return report
+
+
+@router.get("/trade/export")
+def export_trades(
+        *,
+        format: str = 'csv',
+        current_user: user_models.User = Depends(get_current_active_user),
+):
+    """
+    Stream all of the user's trades as csv, ndjson or parquet (needs pyarrow).
+    """
+    trade_io.check_export_format(format)
+    media_type, extension = trade_io.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        trade_io.export_trades(current_user.uid, format),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="trades.{extension}"'},
+    )
+
+
 @router.put("/trade/{trade_uid}", response_model=schemas.Trade)
 def update_trade(
         *,
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from fastapi import (
     APIRouter,
     Depends,
@@ -32,6 +32,7 @@ def read_trading_plans(
         shared: bool = False,
         sort_on: str = 'uid',
         sort_order: str = 'desc',
+        cursor: Optional[str] = None,
         current_user: user_models.User = Depends(get_current_active_user),
 ):
     """
@@ -45,7 +46,8 @@ def read_trading_plans(
         owner_uid=current_user.uid,
         shared=shared,
         sort_on=sort_on,        
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
     return t_plans
 
@@ -6,12 +6,14 @@ from mspt.apps.users import schemas as user_schemas
 
 
 class BasePaginated(BaseModel):
-    count: int
-    page: int
-    pages: int
+    count: Optional[int] = None
+    page: Optional[int] = None
+    pages: Optional[int] = None
     size: int
     next_url: Optional[str] = None
     prev_url: Optional[str] = None
+    next_cursor: Optional[str] = None
+    count_strategy: Optional[str] = None
 
 
 #
@@ -80,10 +82,20 @@ class StrategyPlusStats(Strategy):
     total_trades: int
     won_trades: int
     lost_trades: int
+    win_rate: float = 0
     
 class StrategyPlusStatsPaginated(BasePaginated):
     items: List[StrategyPlusStats]
 
+#
+# ............................................ ImageVariant Schemas
+#
+class ImageVariant(BaseModel):
+    width: int
+    format: str
+    url: str
+
+
 #
 # ............................................ StrategyImage Schemas
 #
@@ -107,6 +119,8 @@ class StrategyImageLocation(BaseModel):
     alt: str
     location: str
 
+    variants: Optional[List[ImageVariant]] = []
+
     class Config:
         orm_mode = True
 
@@ -204,6 +218,49 @@ class TradeDelete(TradeBase):
 class TradePaginated(BasePaginated):
     items: List[Trade]
 
+#
+# ............................................ Trade Import Schemas
+#
+class TradeImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class TradeImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TradeImportError] = []
+
+#
+# ............................................ Trade Statistics Schemas
+#
+class TradeStats(BaseModel):
+    instrument_uid: Optional[int] = None
+    instrument: Optional[str] = None
+    strategy_uid: Optional[int] = None
+    strategy: Optional[str] = None
+    style_uid: Optional[int] = None
+    style: Optional[str] = None
+    position: Optional[bool] = None
+    total_trades: int = 0
+    won_trades: int = 0
+    lost_trades: int = 0
+    win_rate: float = 0
+    avg_rr: Optional[float] = None
+    avg_pips: Optional[float] = None
+    avg_pips_won: Optional[float] = None
+    avg_pips_lost: Optional[float] = None
+    total_pips: int = 0
+
+class TradeStatistics(BaseModel):
+    overall: TradeStats
+    by_instrument: List[TradeStats] = []
+    by_strategy: List[TradeStats] = []
+    by_style: List[TradeStats] = []
+    by_position: List[TradeStats] = []
+    instrument_by_strategy: List[TradeStats] = []
+    instrument_by_style: List[TradeStats] = []
+    instrument_by_position: List[TradeStats] = []
+
 #
 # ............................................ TradeImage Schemas
 #
@@ -227,6 +284,8 @@ class TradeImageLocation(BaseModel):
     alt: str
     location: str
 
+    variants: Optional[List[ImageVariant]] = []
+
     class Config:
         orm_mode = True
 
@@ -241,6 +300,28 @@ class TradeImageCreate(TradeImageBase):
     trade: Optional[Trade] = None
 
 
+#
+# ............................................ UploadJob Schemas
+#
+class UploadJobFile(BaseModel):
+    filename: str
+    status: str
+    attempts: int
+    reused: bool = False
+    image_uid: Optional[int] = None
+    error: Optional[str] = None
+
+
+class UploadJob(BaseModel):
+    job_uid: str
+    status: str
+    parent: str
+    parent_uid: str
+    files: List[UploadJobFile]
+    created: float
+    finished: Optional[float] = None
+
+
 #
 # ............................................ TradingPlan Schemas
 #
@@ -413,6 +494,8 @@ class StudyItemImageLocation(BaseModel):
     alt: str
     location: str
 
+    variants: Optional[List[ImageVariant]] = []
+
     class Config:
         orm_mode = True
 
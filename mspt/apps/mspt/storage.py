@@ -0,0 +1,172 @@
+"""
+Image storage backends, selected with config.IMAGE_STORAGE_BACKEND.
+
+A backend stores a file already staged under media/ and identifies the stored
+asset by a key kept in the image's `public_uid` column.
+"""
+import hashlib
+from typing import Dict
+
+import cloudinary as Cloud
+from cloudinary.exceptions import Error as CloudError
+from cloudinary.uploader import (
+    upload_large as CloudLargeUploader,
+    destroy as CloudDestroy,
+)
+from fastapi import HTTPException, UploadFile
+
+from mspt.settings import config
+from mspt.utils.create_dirs import deleteFile
+
+PRESET_TESTING = 'mspt_testing'
+PRESET_PRODUCTION = 'mspt_osok'
+
+# how the sdk words the errors raised while sending a request, as opposed to
+# errors the API answered with (1.24 raises the base Error class for all of them)
+_CLOUD_TRANSPORT_ERRORS = ('Socket error', 'Unexpected error')
+
+
+class UploadError(Exception):
+    """
+    A failed upload, `retryable` when the storage answered and nothing was
+    stored. Errors while sending (timeouts included) may leave the file stored
+    anyway, uploading it again could store it twice.
+    """
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class StorageBackend:
+    # whether the staged file is the stored asset and must stay on disk
+    keeps_file = False
+
+    def upload(self, file_path: str, *, tags: str, caption: str, parent: str) -> Dict:
+        """
+        Store a staged file, returns its metadata as taken by persist_image_metadata
+        (url, public_uid, asset_uid, signature, version, version_uid). Raises
+        UploadError when the storage refused it or could not be reached.
+        """
+        raise NotImplementedError
+
+    def delete(self, public_uid: str) -> bool:
+        """Remove a stored asset, True when it is gone"""
+        raise NotImplementedError
+
+    def url(self, public_uid: str) -> str:
+        raise NotImplementedError
+
+
+class CloudinaryBackend(StorageBackend):
+    def __init__(self):
+        Cloud.config(
+            cloud_name=config.CLOUDINARY_CLOUD_NAME,
+            api_key=config.CLOUDINARY_API_KEY,
+            api_secret=config.CLOUDINARY_API_SECRET,
+        )
+
+    def upload(self, file_path: str, *, tags: str, caption: str, parent: str) -> Dict:
+        options = dict()
+        options['tags'] = [tag.strip() for tag in tags.split(",")] if tags else []
+        options['upload_preset'] = PRESET_PRODUCTION
+        options['context'] = f'caption={caption}|alt={tags}'
+        options['folder'] = _folder_from_preset(parent, PRESET_PRODUCTION)
+        # socket timeout, so an abandoned upload does not hold its thread forever
+        options['timeout'] = config.UPLOAD_TIMEOUT
+        # upload_large defaults to raw, which would store the asset as a plain file
+        options['resource_type'] = 'image'
+        try:
+            # sent in chunks, so memory stays bounded by the chunk size whatever the file size
+            response = CloudLargeUploader(file_path, chunk_size=config.CLOUDINARY_CHUNK_SIZE, **options)
+        except CloudError as exc:
+            raise UploadError(str(exc), retryable=not str(exc).startswith(_CLOUD_TRANSPORT_ERRORS)) from exc
+        return {
+            'url': response.get('url', None),
+            'public_uid': response.get('public_id', None),
+            'asset_uid': response.get('asset_id', None),
+            'signature': response.get('signature', None),
+            'version': response.get('version', None),
+            'version_uid': response.get('version_id', None),
+        }
+
+    def delete(self, public_uid: str) -> bool:
+        # must match the resource type upload stored the asset with
+        return CloudDestroy(public_uid, resource_type='image').get('result', '') == 'ok'
+
+    def url(self, public_uid: str) -> str:
+        return Cloud.CloudinaryImage(public_uid).build_url()
+
+
+class LocalBackend(StorageBackend):
+    """Keeps the staged file under media/, served by the /media mount"""
+    keeps_file = True
+
+    def upload(self, file_path: str, *, tags: str, caption: str, parent: str) -> Dict:
+        return {'url': self.url(file_path), 'public_uid': file_path}
+
+    def delete(self, public_uid: str) -> bool:
+        return deleteFile(public_uid)
+
+    def url(self, public_uid: str) -> str:
+        return '/' + public_uid
+
+
+BACKENDS = {
+    'cloudinary': CloudinaryBackend,
+    'local': LocalBackend,
+}
+
+_backend = None
+
+
+def get_backend() -> StorageBackend:
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        try:
+            _backend = BACKENDS[config.IMAGE_STORAGE_BACKEND]()
+        except KeyError:
+            raise Exception(f"Unknown Storage Backend: {config.IMAGE_STORAGE_BACKEND}")
+    return _backend
+
+
+def stage_upload(upload_file: UploadFile, file_path: str, max_bytes: int = None) -> str:
+    """
+    Copy `upload_file` to `file_path` chunk by chunk, aborting with 413 as soon
+    as more than `max_bytes` (default config.UPLOAD_MAX_BYTES) were read.
+    Returns the sha256 hex digest of the content.
+    """
+    if max_bytes is None:
+        max_bytes = config.UPLOAD_MAX_BYTES
+    written = 0
+    digest = hashlib.sha256()
+    upload_file.file.seek(0)
+    try:
+        with open(file_path, 'wb') as out:
+            while True:
+                chunk = upload_file.file.read(config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{upload_file.filename} is larger than {max_bytes} bytes",
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        deleteFile(file_path)
+        raise
+    return digest.hexdigest()
+
+
+def _folder_from_preset(parent: str, preset: str):
+    _base_folder = ""
+    if preset == PRESET_PRODUCTION:
+        _base_folder = "mspt"
+    else:
+        _base_folder = "testing"
+
+    return f"{_base_folder}/{parent}"
@@ -0,0 +1,230 @@
+"""
+Readers for bulk trade imports and writers for exports. Both stream: imports
+are consumed line by line, exports are written in batches read from a server
+side cursor, neither is ever held in memory whole.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+from mspt.apps.mspt import crud
+from mspt.settings import config
+from mspt.settings.database import SessionLocal
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for parquet exports
+    pyarrow = None
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+IMPORT_FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+# (line number, parsed row or the reason it could not be parsed)
+ParsedRow = Tuple[int, Union[Dict[str, Any], str]]
+
+
+def import_format(fmt: Optional[str], filename: Optional[str]) -> str:
+    """`fmt` as given, else guessed from the file extension"""
+    if not fmt and filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        fmt = {'csv': FORMAT_CSV, 'jsonl': FORMAT_JSONL, 'ndjson': FORMAT_JSONL, 'json': FORMAT_JSONL}.get(extension)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown import format: {fmt}, expected one of {', '.join(IMPORT_FORMATS)}",
+        )
+    return fmt
+
+
+def read_trade_rows(binary_file: IO[bytes], fmt: str) -> Iterator[ParsedRow]:
+    """
+    Parsed rows of an import file. Bytes that are not UTF-8 and CSV that can
+    not be parsed any further answer 400, the import is rejected as a whole.
+    """
+    text = _decoded_lines(binary_file)
+    if fmt == FORMAT_CSV:
+        return _read_csv(text)
+    return _read_jsonl(text)
+
+
+def _decoded_lines(binary_file: IO[bytes]) -> Iterator[str]:
+    # decoded line by line, so invalid bytes are reported on the line they are on
+    for line_num, line in enumerate(binary_file, start=1):
+        try:
+            yield line.decode('utf-8-sig' if line_num == 1 else 'utf-8')
+        except UnicodeDecodeError as exc:
+            raise HTTPException(status_code=400, detail=f"Line {line_num} is not valid UTF-8: {exc.reason}")
+
+
+def _read_csv(text) -> Iterator[ParsedRow]:
+    reader = csv.DictReader(text)
+    try:
+        for row in reader:
+            # empty cells fall back to the schema defaults
+            yield reader.line_num, {
+                key.strip(): value.strip() for key, value in row.items() if key and value is not None and value.strip()
+            }
+    except csv.Error as exc:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV near line {reader.line_num}: {exc}")
+
+
+def _read_jsonl(text) -> Iterator[ParsedRow]:
+    for line_num, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_num, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_num, "Expected a JSON object"
+            continue
+        yield line_num, row
+
+
+EXPORT_CSV = 'csv'
+EXPORT_NDJSON = 'ndjson'
+EXPORT_PARQUET = 'parquet'
+
+# format: (media type, file extension)
+EXPORT_FORMATS = {
+    EXPORT_CSV: ('text/csv', 'csv'),
+    EXPORT_NDJSON: ('application/x-ndjson', 'ndjson'),
+    EXPORT_PARQUET: ('application/octet-stream', 'parquet'),
+}
+
+
+def check_export_format(fmt: str):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export format: {fmt}, expected one of {', '.join(EXPORT_FORMATS)}",
+        )
+    if fmt == EXPORT_PARQUET and pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet exports need pyarrow installed")
+
+
+def export_trades(owner_uid: int, fmt: str) -> Iterator[Union[str, bytes]]:
+    """
+    Chunks of the user's trades in `fmt`. Runs with its own session, the
+    response is still streaming after the request's session was closed.
+    """
+    batch_size = config.TRADE_EXPORT_BATCH_SIZE
+    db = SessionLocal()
+    try:
+        qry = crud.trade.export_query(db, owner_uid=owner_uid)
+        columns = [(column['name'], column['type']) for column in qry.column_descriptions]
+        # yield_per also turns on stream_results, psycopg2 then reads through a named cursor
+        rows = qry.yield_per(batch_size)
+        if fmt == EXPORT_CSV:
+            yield from _csv_chunks(rows, columns, batch_size)
+        elif fmt == EXPORT_NDJSON:
+            yield from _ndjson_chunks(rows, columns, batch_size)
+        else:
+            yield from _parquet_chunks(rows, columns, batch_size)
+    finally:
+        db.close()
+
+
+def _batches(rows: Iterable[Sequence], batch_size: int) -> Iterator[List[Sequence]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(rows, columns, batch_size) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in _batches(rows, batch_size):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, columns, batch_size) -> Iterator[str]:
+    names = [name for name, _ in columns]
+    for batch in _batches(rows, batch_size):
+        yield ''.join(json.dumps(dict(zip(names, row)), default=_json_value) + '\n' for row in batch)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file whose content is handed out and dropped chunk by chunk"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(sqla_type):
+    if isinstance(sqla_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(sqla_type, Integer):
+        return pyarrow.int64()
+    if isinstance(sqla_type, Float):
+        return pyarrow.float64()
+    if isinstance(sqla_type, DateTime):
+        return pyarrow.timestamp('us')
+    return pyarrow.string()
+
+
+def _parquet_chunks(rows, columns, batch_size) -> Iterator[bytes]:
+    # one row group per batch, the schema comes from the column types so all-null batches still fit
+    schema = pyarrow.schema([(name, _arrow_type(sqla_type)) for name, sqla_type in columns])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema)
+    try:
+        for batch in _batches(rows, batch_size):
+            data = {name: [row[i] for row in batch] for i, (name, _) in enumerate(columns)}
+            writer.write_table(pyarrow.Table.from_pydict(data, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
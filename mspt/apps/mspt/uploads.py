@@ -0,0 +1,287 @@
+"""
+Background image ingestion.
+
+`/uploads-handler` stages the files under media/ and queues one job per
+request, workers owned by the app upload the files of a job concurrently,
+retrying with backoff on errors the storage API answered with, and persist
+their metadata. Staged files are removed once their job is over, unless the
+backend serves them. Jobs live in this process only: polling must reach the
+worker that accepted the upload and jobs still queued at shutdown are lost
+(their staged files stay on disk).
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from mspt.apps.mspt import utils
+from mspt.apps.mspt.storage import StorageBackend, UploadError, get_backend, stage_upload
+from mspt.apps.mspt.variants import create_variants
+from mspt.settings import config
+from mspt.settings.database import SessionLocal
+from mspt.utils.cache import TTLCache
+from mspt.utils.create_dirs import deleteFile, resolve_media_dirs_for
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class UploadQueue:
+    """
+    Job store plus the asyncio workers that drain it, at most `workers`
+    uploads are in flight at once across all jobs
+    """
+
+    def __init__(self, workers: int, backend: Optional[StorageBackend] = None):
+        # None follows config.IMAGE_STORAGE_BACKEND
+        self._backend = backend
+        self.workers = workers
+        self.jobs = TTLCache(maxsize=10000, ttl=config.UPLOAD_JOB_TTL)
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self, files: List[UploadFile], *, parent: str, parent_uid: str, tags: str, caption: str
+    ) -> Dict[str, Any]:
+        """Stage `files` to disk and queue them, returns the job"""
+        media_dir = resolve_media_dirs_for(parent)
+        staged = []
+        try:
+            for _file in files:
+                file_path = f"{media_dir}{uuid.uuid4().hex}-{_file.filename}"
+                content_hash = await run_in_threadpool(stage_upload, _file, file_path)
+                staged.append({
+                    'filename': _file.filename,
+                    'path': file_path,
+                    'content_hash': content_hash,
+                    'reused': False,
+                    'status': JOB_QUEUED,
+                    'attempts': 0,
+                    'image_uid': None,
+                    'error': None,
+                })
+        except BaseException:
+            # all or nothing, do not leave the files staged so far behind
+            for _staged in staged:
+                deleteFile(_staged['path'])
+            raise
+
+        job = {
+            'job_uid': uuid.uuid4().hex,
+            'status': JOB_QUEUED,
+            'parent': parent,
+            'parent_uid': parent_uid,
+            'tags': tags,
+            'caption': caption,
+            'files': staged,
+            'created': time.time(),
+            'finished': None,
+        }
+        self.jobs.set(job['job_uid'], job)
+        self._queue.put_nowait(job)
+        return job
+
+    @property
+    def backend(self) -> StorageBackend:
+        return self._backend or get_backend()
+
+    def get(self, job_uid: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_uid)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception("Upload job %s crashed", job['job_uid'])
+                job['status'] = JOB_FAILED
+            finally:
+                job['finished'] = time.time()
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]):
+        job['status'] = JOB_RUNNING
+        try:
+            # content already stored for any image is reused instead of uploaded again
+            assets = await run_in_threadpool(_find_assets, [staged['content_hash'] for staged in job['files']])
+            found = {asset['public_uid'] for asset in assets.values()}
+            uploaded = []
+            new: Dict[str, List[Dict[str, Any]]] = {}
+            for staged in job['files']:
+                if staged['content_hash'] in assets:
+                    staged['reused'] = True
+                    uploaded.append((staged, dict(assets[staged['content_hash']])))
+                else:
+                    new.setdefault(staged['content_hash'], []).append(staged)
+            uploaded = _in_file_order(job, uploaded + await self._ingest_all(job, new))
+
+            while uploaded:
+                gone = await self._persist(job, uploaded, found)
+                if not gone:
+                    break
+                found -= gone
+                uploaded = await self._store_again(job, uploaded, gone)
+        finally:
+            self._discard_staged(job)
+
+        failed = any(staged['status'] == JOB_FAILED for staged in job['files'])
+        job['status'] = JOB_FAILED if failed else JOB_DONE
+
+    def _discard_staged(self, job: Dict[str, Any]):
+        """Staged files only stay on disk as the stored asset of an image, see StorageBackend.keeps_file"""
+        for staged in job['files']:
+            if staged['status'] != JOB_DONE or staged['reused'] or not self.backend.keeps_file:
+                deleteFile(staged['path'])
+
+    async def _ingest_all(
+        self, job: Dict[str, Any], contents: Dict[str, List[Dict[str, Any]]]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Store the staged files of `contents` (content hash -> staged files with
+        that content) concurrently, uploading each content once. Returns the
+        (staged, metadata) of every file stored, the copies share the metadata.
+        """
+        results = await asyncio.gather(*[self._ingest(job, copies[0]) for copies in contents.values()])
+        stored = []
+        for (content_hash, copies), metadata in zip(contents.items(), results):
+            first = copies[0]
+            for staged in copies[1:]:
+                staged['reused'] = True
+            if metadata is None:
+                for staged in copies[1:]:
+                    staged['status'], staged['error'] = JOB_FAILED, first['error']
+                continue
+            stored.extend((staged, dict(metadata, content_hash=content_hash)) for staged in copies)
+        return stored
+
+    async def _ingest(self, job: Dict[str, Any], staged: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Store one staged file and its variants, returns its metadata or None when it failed"""
+        staged['status'] = JOB_RUNNING
+        try:
+            metadata = await self._upload_with_retries(job, staged)
+            metadata['variants'] = await create_variants(
+                self.backend, staged['path'], tags=job['tags'], caption=job['caption'], parent=job['parent']
+            )
+        except Exception as exc:
+            logger.warning("Upload of %s failed: %s", staged['path'], exc)
+            _fail(staged, exc)
+            return None
+        return metadata
+
+    async def _persist(
+        self, job: Dict[str, Any], uploaded: List[Tuple[Dict[str, Any], Dict[str, Any]]], found: Set[str]
+    ) -> Set[str]:
+        """
+        Metadata of the whole job goes in with one insert and one commit.
+        Returns the `found` assets it reuses that were deleted meanwhile, in
+        which case nothing was stored.
+        """
+        reused = [metadata['public_uid'] for _, metadata in uploaded if metadata['public_uid'] in found]
+        try:
+            uids = await run_in_threadpool(
+                _persist, job['parent'], job['parent_uid'], [metadata for _, metadata in uploaded], reused
+            )
+        except utils.AssetGone as exc:
+            logger.info("Upload job %s reused deleted assets: %s", job['job_uid'], exc)
+            return exc.public_uids
+        except Exception as exc:
+            logger.warning("Persisting upload job %s failed: %s", job['job_uid'], exc)
+            for staged, _ in uploaded:
+                _fail(staged, exc)
+            return set()
+
+        for (staged, _), uid in zip(uploaded, uids):
+            staged['image_uid'] = uid
+            staged['status'] = JOB_DONE
+        return set()
+
+    async def _store_again(
+        self, job: Dict[str, Any], uploaded: List[Tuple[Dict[str, Any], Dict[str, Any]]], gone: Set[str]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Upload the files whose reused asset is `gone` after all, once per content"""
+        kept = []
+        retry: Dict[str, List[Dict[str, Any]]] = {}
+        for staged, metadata in uploaded:
+            if metadata['public_uid'] in gone:
+                retry.setdefault(staged['content_hash'], []).append(staged)
+            else:
+                kept.append((staged, metadata))
+        for copies in retry.values():
+            copies[0]['reused'] = False
+        return _in_file_order(job, kept + await self._ingest_all(job, retry))
+
+    async def _upload_with_retries(self, job: Dict[str, Any], staged: Dict[str, Any]) -> Dict[str, Any]:
+        while True:
+            staged['attempts'] += 1
+            try:
+                # the backend bounds the upload with its own timeout, the thread is
+                # done with the file before any retry starts
+                async with self._slots:
+                    return await run_in_threadpool(
+                        self.backend.upload,
+                        staged['path'],
+                        tags=job['tags'],
+                        caption=job['caption'],
+                        parent=job['parent'],
+                    )
+            except UploadError as exc:
+                # without an answer from the storage the file may be stored already
+                if not exc.retryable or staged['attempts'] > config.UPLOAD_RETRIES:
+                    raise
+                delay = config.UPLOAD_RETRY_BACKOFF * 2 ** (staged['attempts'] - 1)
+                logger.info("Retrying upload of %s in %ss: %r", staged['path'], delay, exc)
+                await asyncio.sleep(delay)
+
+
+def _in_file_order(
+    job: Dict[str, Any], uploaded: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    # images are stored in the order of the files
+    position = {id(staged): index for index, staged in enumerate(job['files'])}
+    return sorted(uploaded, key=lambda item: position[id(item[0])])
+
+
+def _fail(staged: Dict[str, Any], exc: Exception):
+    staged['status'] = JOB_FAILED
+    staged['error'] = getattr(exc, 'detail', None) or str(exc) or exc.__class__.__name__
+
+
+def _find_assets(content_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        return utils.find_assets(db, content_hashes)
+    finally:
+        db.close()
+
+
+def _persist(parent: str, parent_uid: str, images: List[Dict[str, Any]], reused: List[str]) -> List[int]:
+    # workers run outside any request, they get their own session
+    db = SessionLocal()
+    try:
+        return utils.persist_images_metadata(db=db, parent=parent, parent_uid=parent_uid, images=images, reused=reused)
+    finally:
+        db.close()
+
+
+upload_queue = UploadQueue(workers=config.UPLOAD_CONCURRENCY)
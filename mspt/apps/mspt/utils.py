@@ -1,29 +1,12 @@
-from typing import Dict, Optional, List, Any
-
-import cloudinary as Cloud
-from cloudinary.exceptions import Error as CloudinaryErrorException
-from cloudinary.uploader import (
-    upload as  CloudUploader,
-    destroy as  CloudDestroy,
-)
-import io
-from PIL import Image
+from typing import Dict, List, Any, Sequence, Set
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
-from mspt.utils.create_dirs import deleteFile
 from mspt.apps.mspt import models
+from mspt.apps.mspt.storage import get_backend
 
-
-Cloud.config(
-  cloud_name = 'd3sage',  
-  api_key = '979235147696769',  
-  api_secret = '4QrvbQ_BDUw32ns6WeIf6pABf6U'
-)
-
-PRESET_TESTING = 'mspt_testing'
-PRESET_PRODUCTION = 'mspt_osok'
 # overwrite, use_filename, unique_filename
 # upload_preset = 'mspt_testing', # mspt_osok,
 # Cloudinary Error Handling Codes
@@ -38,110 +21,189 @@ PRESET_PRODUCTION = 'mspt_osok'
 # context alt=My image❘caption=Profile image or ['alt': 'My image', 'caption': 'Profile image']
 # metadata = in_stock_uid=50❘color_uid=[\"green\",\"red\"]
 
-def persist_image_metadata(db: Session, parent: str, parent_uid: str, location: str, alt: str = "", **kwargs):
-    if parent == "studyitem":
-        image_obj = models.StudyItemImage()
-        image_obj.studyitem = db.query(models.StudyItem).get(int(parent_uid))
-        image_obj.studyitem_uid = int(parent_uid)
-    elif parent == "trade":
-        image_obj = models.TradeImage()
-        image_obj.trade = db.query(models.Trade).get(int(parent_uid))
-        image_obj.trade_uid = int(parent_uid)
-    elif parent == "strategy":
-        image_obj = models.StrategyImage()
-        image_obj.strategy = db.query(models.Strategy).get(int(parent_uid))
-        image_obj.strategy_uid = int(parent_uid)    
-    else:
-        raise Exception(f"Unknown Parent: {parent}")
+# parent name: (image model, parent model, foreign key on the image)
+IMAGE_PARENTS = {
+    "studyitem": (models.StudyItemImage, models.StudyItem, "studyitem_uid"),
+    "trade": (models.TradeImage, models.Trade, "trade_uid"),
+    "strategy": (models.StrategyImage, models.Strategy, "strategy_uid"),
+}
 
-    image_obj.alt = alt
-    image_obj.location = location
-    image_obj.public_uid = kwargs.get('public_uid', None)
-    image_obj.asset_uid = kwargs.get('asset_uid', None)
-    image_obj.signature = kwargs.get('signature', None)
-    image_obj.version = kwargs.get('version', None)
-    image_obj.version_uid = kwargs.get('version_uid', None)
-    db.add(image_obj)
-    db.commit()
-    db.refresh(image_obj)
-    
-    
-async def save_or_upload(
-    file_path: str, 
-    img_file, 
-    tags: str, 
-    caption:str, 
-    parent: str, 
-    parent_uid: str,
-    save: bool = False
-    ) -> Optional[Dict]:
-    
-    await img_file.seek(0)
-    image = await img_file.read()        
-    if save:
-        """Save to local disk"""
-        _image = Image.open(io.BytesIO(image))
-        _image.save(file_path)
-        #response = await CloudUploader(file_path,  tags=tags) 
-    
-    options = dict()
-    options['tags'] = [tag.strip() for tag in tags.split(",")] if tags else []
-    options['upload_preset'] = PRESET_PRODUCTION
-    options['context'] = f'caption={caption}|alt={tags}'
-    options['folder'] = _folder_from_preset(parent, PRESET_PRODUCTION)
-        
-    response = None
+# metadata columns taken as they come from the storage backend
+IMAGE_METADATA = ('public_uid', 'asset_uid', 'signature', 'version', 'version_uid', 'variants', 'content_hash')
+
+# what a reused asset carries over from the image already holding it
+ASSET_COLUMNS = ('location', 'public_uid', 'asset_uid', 'signature', 'version', 'version_uid', 'variants')
+
+
+class AssetGone(Exception):
+    """Assets looked up for reuse that were deleted before the images reusing them were stored"""
+
+    def __init__(self, public_uids: Set[str]):
+        super().__init__(f"Assets deleted meanwhile: {', '.join(sorted(public_uids))}")
+        self.public_uids = public_uids
+
+
+def _image_parent(parent: str):
     try:
-        response = CloudUploader(image, **options)
-    except CloudinaryErrorException as ce:
-        raise HTTPException(
-            status_code=424, # Failed Dependency, 500 Internal server Error, # 503 Service unavailable
-            detail=f"Cloudinary Image Backend Error {ce}",
-            headers={'X-Error': f"{ce}"}
-            )
+        return IMAGE_PARENTS[parent]
+    except KeyError:
+        raise Exception(f"Unknown Parent: {parent}")
+
+
+def get_parent_or_404(db: Session, parent: str, parent_uid: str) -> int:
+    _, parent_model, _ = _image_parent(parent)
+    uid = db.query(parent_model.uid).filter(parent_model.uid == int(parent_uid)).scalar()
+    if uid is None:
+        raise HTTPException(status_code=404, detail=f"{parent} {parent_uid} not found")
+    return uid
+
+
+def find_assets(db: Session, content_hashes: List[str]) -> Dict[str, Dict]:
+    """
+    Stored assets of any image type matching `content_hashes`, as metadata
+    dicts ready for persist_images_metadata keyed by hash.
+    """
+    assets = {}
+    content_hashes = [h for h in set(content_hashes) if h]
+    if not content_hashes:
+        return assets
+    for image_model, _, _ in IMAGE_PARENTS.values():
+        columns = [getattr(image_model, column) for column in ASSET_COLUMNS]
+        rows = (
+            db.query(image_model.content_hash, *columns)
+            .filter(image_model.content_hash.in_(content_hashes), image_model.public_uid.isnot(None))
+            .distinct(image_model.content_hash)
+            .all()
+        )
+        for content_hash, *values in rows:
+            asset = dict(zip(ASSET_COLUMNS, values))
+            asset['url'] = asset.pop('location')
+            asset['content_hash'] = content_hash
+            assets.setdefault(content_hash, asset)
+    return assets
+
 
-    return response
+def persist_images_metadata(
+    db: Session, parent: str, parent_uid: str, images: List[Dict], reused: Sequence[str] = ()
+) -> List[int]:
+    """
+    Store the metadata of several images of one parent with a single insert and
+    commit, `images` are dicts of url, alt and IMAGE_METADATA. Returns the new uids in order.
+    `reused` are the public_uids of assets found with find_assets, AssetGone is
+    raised (and nothing stored) when any of them was deleted since.
+    """
+    image_model, _, parent_fk = _image_parent(parent)
+    parent_uid = get_parent_or_404(db, parent, parent_uid)
+    if not images:
+        return []
+
+    if reused:
+        # the images holding them stay locked until the insert commits, so
+        # delete_images counts the new references before removing an asset
+        gone = set(reused) - _lock_assets(db, reused, read=True)
+        if gone:
+            db.rollback()
+            raise AssetGone(gone)
+
+    # an image already attached to this parent is not attached twice
+    hashes = [image.get('content_hash', None) for image in images]
+    existing = dict(
+        db.query(image_model.content_hash, image_model.uid)
+        .filter(getattr(image_model, parent_fk) == parent_uid, image_model.content_hash.in_([h for h in hashes if h]))
+        .all()
+    ) if any(hashes) else {}
+
+    rows = []
+    for image in images:
+        content_hash = image.get('content_hash', None)
+        if content_hash and content_hash in existing:
+            continue
+        row = {column: image.get(column, None) for column in IMAGE_METADATA}
+        row[parent_fk] = parent_uid
+        row['location'] = image.get('url', None)
+        row['alt'] = image.get('alt', "")
+        rows.append(row)
+        if content_hash:
+            existing[content_hash] = None
+
+    new_uids = iter(())
+    if rows:
+        table = image_model.__table__
+        result = db.execute(table.insert().values(rows).returning(table.c.uid))
+        new_uids = iter([row[0] for row in result])
+        db.commit()
+
+    uids = []
+    for image, content_hash in zip(images, hashes):
+        if content_hash and existing[content_hash] is not None:
+            uids.append(existing[content_hash])
+            continue
+        uid = next(new_uids)
+        if content_hash:
+            existing[content_hash] = uid
+        uids.append(uid)
+    return uids
+
+
+def persist_image_metadata(db: Session, parent: str, parent_uid: str, location: str, alt: str = "", **kwargs) -> int:
+    return persist_images_metadata(db, parent, parent_uid, [dict(kwargs, url=location, alt=alt)])[0]
 
 
 def get_image_response(db: Session, parent: str, parent_uid:str) -> List[Any]:
-    if parent == "studyitem":
-        images = db.query(models.StudyItemImage).filter_by(studyitem_uid=int(parent_uid)).offset(0).limit(100).all()
-    elif parent == "trade":
-        images = db.query(models.TradeImage).filter_by(trade_uid=int(parent_uid)).offset(0).limit(100).all()
-    elif parent == "strategy":
-        images = db.query(models.StrategyImage).filter_by(strategy_uid=int(parent_uid)).offset(0).limit(100).all()
-    else:
-        raise Exception(f"Unknown Parent: {parent}")
+    image_model, _, parent_fk = _image_parent(parent)
+    images = db.query(image_model).filter_by(**{parent_fk: int(parent_uid)}).offset(0).limit(100).all()
     return images
 
 
-def delete_images(db: Session, parent: str, file_uid: str, local:bool = False):
-    obj = None
-    if parent == "strategy":
-        obj = db.query(models.StrategyImage).get(int(file_uid))
-    elif parent == "trade":
-        obj = db.query(models.TradeImage).get(int(file_uid))
-    elif parent == "studyitem":
-        obj = db.query(models.StudyItemImage).get(int(file_uid))
-
-    if local:
-        if deleteFile(obj.location):
-            db.delete(obj)
-            db.commit()
-    
-    resp = CloudDestroy(obj.public_uid)
-    if resp.get('result', '') == 'ok':
+def delete_images(db: Session, parent: str, file_uid: str):
+    image_model, _, _ = _image_parent(parent)
+    obj = db.query(image_model).get(int(file_uid))
+    if obj is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # assets are shared between images with the same content, only the last reference removes it
+    deleted = True
+    if obj.public_uid is not None:
+        # uploads reusing the asset wait on these locks (see persist_images_metadata),
+        # the references they committed meanwhile are counted by the next statement
+        _lock_assets(db, [obj.public_uid])
+        if not _asset_references(db, obj.public_uid, exclude=obj):
+            backend = get_backend()
+            for variant in obj.variants or []:
+                backend.delete(variant['public_uid'])
+            deleted = backend.delete(obj.public_uid)
+    if deleted:
         db.delete(obj)
         db.commit()
         
-    return resp
-        
-    
-def _folder_from_preset(parent: str, preset: str):
-    _base_folder = ""
-    if preset == PRESET_PRODUCTION:
-        _base_folder = "mspt"
-    else:
-        _base_folder = "testing"
-        
-    return f"{_base_folder}/{parent}"
+    return {'result': 'ok' if deleted else 'not found'}
+
+
+def _asset_references(db: Session, public_uid: str, exclude) -> int:
+    """Images of any type other than `exclude` stored as `public_uid`"""
+    references = 0
+    for image_model, _, _ in IMAGE_PARENTS.values():
+        qry = db.query(func.count(image_model.uid)).filter(image_model.public_uid == public_uid)
+        if isinstance(exclude, image_model):
+            qry = qry.filter(image_model.uid != exclude.uid)
+        references += qry.scalar()
+    return references
+
+
+def _lock_assets(db: Session, public_uids: Sequence[str], read: bool = False) -> Set[str]:
+    """
+    Lock the images of any type stored as one of `public_uids` until the
+    transaction ends, FOR SHARE when `read` else FOR UPDATE. Returns the
+    public_uids some image still holds.
+    """
+    found = set()
+    for image_model, _, _ in IMAGE_PARENTS.values():
+        rows = (
+            db.query(image_model.public_uid)
+            .filter(image_model.public_uid.in_(public_uids))
+            .order_by(image_model.uid)
+            .with_for_update(read=read)
+            .all()
+        )
+        found.update(public_uid for public_uid, in rows)
+    return found
@@ -0,0 +1,87 @@
+"""
+Responsive image variants, resized with Pillow in a process pool at upload
+time and stored with the same backend as the original.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Sequence
+
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from mspt.apps.mspt.storage import StorageBackend
+from mspt.settings import config
+from mspt.utils.create_dirs import deleteFile
+from mspt.utils.pools import BoundedProcessPool
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+variant_pool = BoundedProcessPool(
+    max_workers=config.IMAGE_VARIANT_WORKERS, max_pending=config.IMAGE_VARIANT_WORKERS * 16
+)
+
+
+def make_variants(file_path: str, widths: Sequence[int], formats: Sequence[str], quality: int) -> List[Dict[str, Any]]:
+    """
+    Write a resized copy of `file_path` next to it for every width narrower
+    than the image and every format. Runs in a pool worker.
+    """
+    stem, _ = os.path.splitext(file_path)
+    variants = []
+    with Image.open(file_path) as image:
+        image.load()
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for _format in formats:
+                out = resized
+                if _format == 'jpeg' and out.mode not in ('RGB', 'L'):
+                    out = out.convert('RGB')
+                path = f"{stem}-{width}w.{_format}"
+                out.save(path, PIL_FORMATS[_format], quality=quality)
+                variants.append({'width': width, 'format': _format, 'path': path})
+    return variants
+
+
+async def create_variants(
+    backend: StorageBackend, file_path: str, *, tags: str, caption: str, parent: str
+) -> List[Dict[str, Any]]:
+    """
+    Generate and store the configured variants of a staged image. Variants are
+    an optimisation, on any failure the image is kept without them.
+    """
+    if not config.IMAGE_VARIANT_WIDTHS:
+        return []
+    try:
+        made = await variant_pool.run_async(
+            make_variants,
+            file_path,
+            config.IMAGE_VARIANT_WIDTHS,
+            config.IMAGE_VARIANT_FORMATS,
+            config.IMAGE_VARIANT_QUALITY,
+        )
+    except Exception as exc:
+        # PoolSaturated, a broken pool, undecodable or decompression bomb images...
+        logger.warning("No variants for %s: %r", file_path, exc)
+        return []
+
+    variants = []
+    for variant in made:
+        path = variant.pop('path')
+        try:
+            stored = await run_in_threadpool(backend.upload, path, tags=tags, caption=caption, parent=parent)
+        except Exception as exc:
+            logger.warning("Storing variant %s failed: %r", path, exc)
+            deleteFile(path)
+            continue
+        if not backend.keeps_file:
+            deleteFile(path)
+        variants.append(dict(variant, url=stored.get('url'), public_uid=stored.get('public_uid')))
+    return variants
@@ -1,9 +1,15 @@
 from typing import Optional
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from mspt.apps.users import models
 from mspt.apps.users import schemas
-from mspt.settings.security import verify_password, get_password_hash
+from mspt.settings.security import (
+    get_password_hash,
+    invalidate_cached_user,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
 from mspt.apps.mixins.crud import CRUDMIXIN
 
 
@@ -25,16 +31,45 @@ class CRUDUser(CRUDMIXIN[models.User, schemas.UserCreate, schemas.UserUpdate]):
         db_session.refresh(db_obj)
         return db_obj
 
+    def update(self, db_session: Session, *, db_obj: models.User, obj_in: schemas.UserUpdate) -> models.User:
+        db_obj = super().update(db_session, db_obj=db_obj, obj_in=obj_in)
+        invalidate_cached_user(db_obj.uid)
+        return db_obj
+
     def authenticate(
         self, db_session: Session, *, email: str, password: str
     ) -> Optional[models.User]:
         user = self.get_by_email(db_session, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            self._rehash(db_session, user, new_hash)
         return user
 
+    async def authenticate_async(
+        self, db_session: Session, *, email: str, password: str
+    ) -> Optional[models.User]:
+        """authenticate() that keeps the event loop free, db work runs in the threadpool"""
+        user = await run_in_threadpool(self.get_by_email, db_session, email=email)
+        if not user:
+            return None
+        verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            await run_in_threadpool(self._rehash, db_session, user, new_hash)
+        return user
+
+    def _rehash(self, db_session: Session, user: models.User, hashed_password: str):
+        """Store a hash made with the current bcrypt cost"""
+        user.hashed_password = hashed_password
+        db_session.add(user)
+        db_session.commit()
+        db_session.refresh(user)
+
     def is_active(self, user: models.User) -> bool:
         return user.is_active
 
@@ -92,7 +92,9 @@ def update_user_me(
         user_in.full_name = full_name
     if email is not None:
         user_in.email = email
-    user = crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    # current_user is a cached snapshot, update the row itself
+    db_user = crud.user.get(db, uid=current_user.uid)
+    user = crud.user.update(db, db_obj=db_user, obj_in=user_in)
     return user
 
 
@@ -147,7 +149,7 @@ def read_user_by_id(
     Get a specific user by uid.
     """
     user = crud.user.get(db, uid=user_uid)
-    if user == current_user:
+    if user and user.uid == current_user.uid:
         return user
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
@@ -167,7 +169,7 @@ def update_user(
     """
     Update a user.
     """
-    user = crud.user.get(db, id=user_id)
+    user = crud.user.get(db, uid=user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -8,11 +8,19 @@ if initialize_mspt():
     from mspt.settings import config
     from mspt.utils.create_dirs import resolve_root_dirs
     from mspt.api import api_router
-    from mspt.settings.database import SessionLocal
+    from mspt.settings.database import close_request_db, database
+    from mspt.settings.hashing import hash_pool
+    from mspt.apps.mspt.uploads import upload_queue
+    from mspt.apps.mspt.variants import variant_pool
+    from mspt.utils.responses import ORJSONResponse
 
 
 
-    mspt_app = FastAPI(title=config.PROJECT_NAME, openapi_url=config.API_V1_STR + "/openapi.json")
+    mspt_app = FastAPI(
+        title=config.PROJECT_NAME,
+        openapi_url=config.API_V1_STR + "/openapi.json",
+        default_response_class=ORJSONResponse,
+    )
 
     # CORS
     origins = []
@@ -38,10 +46,25 @@ if initialize_mspt():
     mspt_app.include_router(api_router, prefix=config.API_V1_STR)
 
 
+    @mspt_app.on_event("startup")
+    async def connect_database():
+        await database.connect()
+        await upload_queue.start()
+
+
+    @mspt_app.on_event("shutdown")
+    async def disconnect_database():
+        await upload_queue.stop()
+        await database.disconnect()
+        hash_pool.shutdown()
+        variant_pool.shutdown()
+
+
     @mspt_app.middleware("http")
     async def db_session_middleware(request: Request, call_next):
-        request.state.db = SessionLocal()
-        response = await call_next(request)
-        request.state.db.close()
+        # Sessions are opened lazily by get_db, only close one if the request used it
+        try:
+            response = await call_next(request)
+        finally:
+            close_request_db(request)
         return response
-
@@ -21,6 +21,44 @@ if not SECRET_KEY:
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 8  # 60 minutes * 24 hours * 8 days = 8 days
 
+# Authenticated user snapshots, saves a user lookup on every authenticated request
+USER_CACHE_TTL = int(getenv_value("USER_CACHE_TTL", 60))  # seconds
+USER_CACHE_SIZE = int(getenv_value("USER_CACHE_SIZE", 2048))
+# Verified access tokens, saves the signature check on repeated bearer tokens
+TOKEN_CACHE_TTL = int(getenv_value("TOKEN_CACHE_TTL", 300))  # seconds, never past the token's exp
+TOKEN_CACHE_SIZE = int(getenv_value("TOKEN_CACHE_SIZE", 4096))
+
+# Password hashing, changing BCRYPT_ROUNDS rehashes passwords on their next login
+BCRYPT_ROUNDS = int(getenv_value("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(getenv_value("PASSWORD_HASH_WORKERS", 2))  # processes
+PASSWORD_HASH_MAX_PENDING = int(getenv_value("PASSWORD_HASH_MAX_PENDING", 32))  # beyond this logins get a 503
+
+# Image uploads
+UPLOAD_CONCURRENCY = int(getenv_value("UPLOAD_CONCURRENCY", 4))  # concurrent uploads per worker process
+UPLOAD_TIMEOUT = int(getenv_value("UPLOAD_TIMEOUT", 60))  # seconds, per request to the storage API
+UPLOAD_RETRIES = int(getenv_value("UPLOAD_RETRIES", 3))  # on errors the storage API answered with, never on timeouts
+UPLOAD_RETRY_BACKOFF = int(getenv_value("UPLOAD_RETRY_BACKOFF", 2))  # seconds, doubled on every retry
+UPLOAD_MAX_BYTES = int(getenv_value("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))  # per file, larger files get a 413
+UPLOAD_CHUNK_SIZE = int(getenv_value("UPLOAD_CHUNK_SIZE", 64 * 1024))  # bytes read at a time while staging
+UPLOAD_JOB_TTL = int(getenv_value("UPLOAD_JOB_TTL", 3600))  # seconds a job's status stays available
+
+# Trade import / export
+TRADE_IMPORT_CHUNK_SIZE = int(getenv_value("TRADE_IMPORT_CHUNK_SIZE", 1000))  # rows per INSERT
+TRADE_EXPORT_BATCH_SIZE = int(getenv_value("TRADE_EXPORT_BATCH_SIZE", 1000))  # rows fetched per round trip
+
+# Image storage
+IMAGE_STORAGE_BACKEND = getenv_value("IMAGE_STORAGE_BACKEND", "cloudinary")  # cloudinary or local
+CLOUDINARY_CLOUD_NAME = getenv_value("CLOUDINARY_CLOUD_NAME", 'd3sage')
+CLOUDINARY_API_KEY = getenv_value("CLOUDINARY_API_KEY", '979235147696769')
+CLOUDINARY_API_SECRET = getenv_value("CLOUDINARY_API_SECRET", '4QrvbQ_BDUw32ns6WeIf6pABf6U')
+CLOUDINARY_CHUNK_SIZE = int(getenv_value("CLOUDINARY_CHUNK_SIZE", 6 * 1024 * 1024))  # bytes per upload request, 5MB minimum
+
+# Resized copies generated at upload time, an empty IMAGE_VARIANT_WIDTHS disables them
+IMAGE_VARIANT_WIDTHS = [int(w) for w in getenv_value("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if w.strip()]
+IMAGE_VARIANT_FORMATS = [f.strip() for f in getenv_value("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",") if f.strip()]
+IMAGE_VARIANT_QUALITY = int(getenv_value("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_VARIANT_WORKERS = int(getenv_value("IMAGE_VARIANT_WORKERS", 2))  # processes
+
 SERVER_NAME = os.getenv("SERVER_NAME")
 SERVER_HOST = os.getenv("SERVER_HOST")
 BACKEND_CORS_ORIGINS = os.getenv(
@@ -46,6 +84,18 @@ except Exception:
 SQLALCHEMY_DATABASE_URI = DATABASE_URI
 # SQLALCHEMY_DATABASE_URI = "sqlite:///testing.db"
 
+# Connection pool, size it for (pool size + overflow) * workers <= postgres max connections
+DB_POOL_SIZE = int(getenv_value("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(getenv_value("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(getenv_value("DB_POOL_TIMEOUT", 30))  # seconds to wait for a connection
+DB_POOL_RECYCLE = int(getenv_value("DB_POOL_RECYCLE", 300))  # seconds, before the server drops idle connections
+DB_POOL_PRE_PING = getenv_boolean("DB_POOL_PRE_PING", True)
+
+# Paginated listing totals: owner listings reuse cached counts, shared listings use planner estimates
+PAGINATION_COUNT_CACHE_TTL = int(getenv_value("PAGINATION_COUNT_CACHE_TTL", 30))  # seconds
+PAGINATION_COUNT_CACHE_SIZE = int(getenv_value("PAGINATION_COUNT_CACHE_SIZE", 4096))
+PAGINATION_ESTIMATE_THRESHOLD = int(getenv_value("PAGINATION_ESTIMATE_THRESHOLD", 1000))  # exact count below this
+
 SMTP_TLS = getenv_boolean("SMTP_TLS", True)
 SMTP_PORT = None
 _SMTP_PORT = os.getenv("SMTP_PORT")
@@ -3,7 +3,10 @@ from .db import (
     db_session,
     SessionLocal,    
     SessionScoped,
-    get_db
+    get_db,
+    close_request_db,
+    database,
+    get_async_db
 )
 
 from .base_class import  (
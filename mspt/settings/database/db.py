@@ -1,10 +1,21 @@
+from databases import Database
 from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from starlette.requests import Request
 
 from mspt.settings import config
+from mspt.settings.database.pool import MeteredQueuePool
 
 
-engine = create_engine(config.SQLALCHEMY_DATABASE_URI) # connect_args={'check_same_thread': False}) #pool_pre_ping=True, connect_args are only for sqlite
+engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI,
+    poolclass=MeteredQueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+) # connect_args={'check_same_thread': False}) connect_args are only for sqlite
 db_session = scoped_session(
     sessionmaker(autocommit=False, autoflush=False, bind=engine)
 )
@@ -12,9 +23,31 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 SessionScoped = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
 # Dependency
-def get_db():
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+def get_db(request: Request) -> Session:
+    """
+    Request-scoped session, created on first use and shared by every dependency
+    of the request. db_session_middleware in main.py closes it after the response.
+    A session only checks out a pooled connection when it runs its first query,
+    so requests that never query never touch the pool.
+    """
+    db = getattr(request.state, 'db', None)
+    if db is None:
+        db = request.state.db = SessionLocal()
+    return db
+
+
+def close_request_db(request: Request):
+    db = getattr(request.state, 'db', None)
+    if db is not None:
+        db.close()
+        request.state.db = None
+
+
+# Async database (asyncpg), connected on app startup. SQLAlchemy 1.3 has no
+# async ORM, so async code runs Core statements (e.g `query.statement`) on it.
+database = Database(config.SQLALCHEMY_DATABASE_URI)
+
+# Async Dependency
+async def get_async_db():
+    async with database.connection() as connection:
+        yield connection
@@ -5,7 +5,7 @@ from .inspection import InspectionMixin
 # high-level mixins
 from .activerecord import ActiveRecordMixin, ModelNotFoundError
 from .smartquery import SmartQueryMixin, smart_query
-from .eagerload import EagerLoadMixin, JOINED, SUBQUERY
+from .eagerload import EagerLoadMixin, JOINED, SUBQUERY, SELECTIN, eager_expr
 from .repr import ReprMixin
 from .serialize import SerializeMixin
 from .timestamp import TimestampsMixin
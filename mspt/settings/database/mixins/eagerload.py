@@ -4,6 +4,7 @@ except ImportError: # pragma: no cover
     pass
 
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import subqueryload
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
@@ -11,6 +12,7 @@ from .session import SessionMixin
 
 JOINED = 'joined'
 SUBQUERY = 'subquery'
+SELECTIN = 'selectin'
 
 
 def eager_expr(schema):
@@ -63,6 +65,8 @@ def _eager_expr_from_flat_schema(flat_schema):
             result.append(joinedload(path))
         elif join_method == SUBQUERY:
             result.append(subqueryload(path))
+        elif join_method == SELECTIN:
+            result.append(selectinload(path))
         else:
             raise ValueError('Bad join method `{}` in `{}`'
                              .format(join_method, path))
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from mspt.utils.metrics import Histogram
+
+
+class PoolMetrics:
+    """Checkout latency and timeouts of the engine's connection pool"""
+
+    def __init__(self):
+        self.checkout_latency = Histogram()
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        return {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'status': pool.status(),
+            'timeouts': self.timeouts,
+            'checkout_latency': self.checkout_latency.snapshot(),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for (or opens) a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timed_out()
+            raise
+        finally:
+            pool_metrics.checkout_latency.observe(time.perf_counter() - start)
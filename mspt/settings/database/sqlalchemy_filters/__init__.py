@@ -2,5 +2,5 @@
 
 from .filters import apply_filters  # noqa: F401
 from .loads import apply_loads  # noqa: F401
-from .pagination2 import apply_pagination  # noqa: F401
+from .pagination2 import apply_pagination, apply_keyset_pagination  # noqa: F401
 from .sorting import apply_sort  # noqa: F401
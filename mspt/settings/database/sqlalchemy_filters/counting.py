@@ -0,0 +1,55 @@
+import json
+
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATE = 'estimate'
+COUNT_WINDOW = 'window'  # count(*) OVER () next to the page rows, see pagination2.apply_pagination
+
+
+def count_results(query, strategy=COUNT_EXACT, *, cache=None, cache_key=None, estimate_threshold=1000):
+    """Count the results of `query` using the given counting strategy.
+
+    * ``exact``: ``SELECT count(*)`` over the query.
+    * ``cached``: reuse a count stored in `cache` under `cache_key`, counting
+      exactly (and storing the count) on a miss.
+    * ``estimate``: the PostgreSQL planner's row estimate. Estimates below
+      `estimate_threshold` are too coarse to show, so they are replaced by an
+      exact count, which is cheap at that size anyway. Other databases have
+      no estimate to offer and always count exactly.
+
+    :returns:
+        A 2-tuple of the count and the strategy that actually produced it.
+    """
+    if strategy == COUNT_CACHED and cache is not None and cache_key is not None:
+        total_results = cache.get(cache_key)
+        if total_results is not None:
+            return total_results, COUNT_CACHED
+        total_results = query.count()
+        cache.set(cache_key, total_results)
+        return total_results, COUNT_EXACT
+
+    if strategy == COUNT_ESTIMATE:
+        estimate = estimate_count(query)
+        if estimate is not None and estimate >= estimate_threshold:
+            return estimate, COUNT_ESTIMATE
+
+    return query.count(), COUNT_EXACT
+
+
+def estimate_count(query):
+    """
+    Row estimate of the planner for `query`, without executing it. None when
+    the database is not PostgreSQL, EXPLAIN (FORMAT JSON) is specific to it.
+    """
+    session = query.session
+    dialect = session.get_bind().dialect
+    if dialect.name != 'postgresql':
+        return None
+    compiled = query.statement.compile(dialect=dialect)
+    result = session.connection().execute(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
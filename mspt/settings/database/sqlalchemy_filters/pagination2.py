@@ -1,27 +1,81 @@
+import base64
+import json
 import math
 from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import and_, func, or_
+from sqlalchemy.util import KeyedTuple
 from starlette.requests import Request
 
+from .counting import COUNT_CACHED, COUNT_ESTIMATE, COUNT_EXACT, COUNT_WINDOW, count_results, estimate_count
 from .exceptions import InvalidPage
+from .models import Field
+from .sorting import SORT_ASCENDING, SORT_DESCENDING
 
 req =  Request
 
 
-def apply_pagination(query, *, page_number=None, page_size=None, request):
-    total_results = query.count()
+def apply_pagination(query, *, page_number=None, page_size=None, request, count_strategy=COUNT_EXACT, count_cache=None, count_key=None, estimate_threshold=1000):
+    """Paginate by page number and fetch the page.
+
+    The total is counted with `count_strategy` (see
+    :func:`.counting.count_results`), the strategy actually used is returned as
+    ``count_strategy``. With ``window``, ``cached`` on a cache miss, or
+    ``estimate`` below `estimate_threshold`, the page and the exact total come
+    back from a single statement using ``count(*) OVER ()``. A larger
+    ``estimate`` total only sizes ``pages``, whether there is a next page is
+    found by fetching one row past the page, so ``next_url`` never points past
+    the last page.
+    """
+    # Page number defaults to 1
+    if page_number is None or page_number < 1:
+        page_number = 1
+
+    total_results = None
+    if count_strategy == COUNT_CACHED and count_cache is not None and count_key is not None:
+        total_results = count_cache.get(count_key)
+    elif count_strategy == COUNT_ESTIMATE and page_size is not None:
+        estimate = estimate_count(query)
+        if estimate is not None and estimate >= estimate_threshold:
+            total_results = estimate
+        else:
+            # small enough (or nothing to estimate with) to count exactly along with the page
+            count_strategy = COUNT_WINDOW
+
+    if total_results is None and count_strategy in (COUNT_CACHED, COUNT_WINDOW) and page_size is not None:
+        items, total_results = _window_page(query, page_number, page_size)
+        if count_strategy == COUNT_CACHED and count_cache is not None and count_key is not None:
+            count_cache.set(count_key, total_results)
+        count_strategy = COUNT_WINDOW
+    else:
+        if total_results is None:
+            total_results, count_strategy = count_results(
+                query, count_strategy, cache=count_cache, cache_key=count_key, estimate_threshold=estimate_threshold
+            )
+        items = None
+
+    has_next = None
+    if count_strategy == COUNT_ESTIMATE and page_size is not None:
+        rows = _offset(_limit(query, page_size + 1), page_number, page_size).all()
+        items, has_next = rows[:page_size], len(rows) > page_size
+        if items and not has_next:
+            # the last page, which makes the total exact
+            total_results = (page_number - 1) * page_size + len(items)
+            count_strategy = COUNT_EXACT
+
     query = _limit(query, page_size)
 
     # Page size defaults to total results
     if page_size is None or (page_size > total_results and total_results > 0):
         page_size = total_results
 
-    # Page number defaults to 1
-    if page_number is None or page_number < 1:
-        page_number = 1
-
     query = _offset(query, page_number, page_size)
+    if items is None:
+        items = query.all()
 
     num_pages = _calculate_num_pages(page_number, page_size, total_results)
+    if has_next is not None:
+        num_pages = max(num_pages, page_number + 1) if has_next else min(num_pages, page_number)
     
     next_url = _get_next(request.url, page_number, page_size, num_pages)
     prev_url = _get_prev(request.url, page_number, page_size)
@@ -29,14 +83,137 @@ def apply_pagination(query, *, page_number=None, page_size=None, request):
     return {
         'count': total_results, 
         'page': page_number, 
-        'items': query, 
+        'items': items, 
         'pages': num_pages, 
         'size': page_size, 
         'next_url': next_url,
         'prev_url': prev_url,
+        'count_strategy': count_strategy,
         }
 
 
+def _window_page(query, page_number, page_size):
+    """Fetch one page together with the total number of results"""
+    windowed = query.add_columns(func.count().over().label('total_results'))
+    windowed = _offset(_limit(windowed, page_size), page_number, page_size)
+    rows = windowed.all()
+    if not rows:
+        # past the last page, the window has no row to report the total on
+        return [], query.count() if page_number > 1 else 0
+    total_results = rows[0][-1]
+    if len(rows[0]) == 2:
+        return [row[0] for row in rows], total_results
+    # column rows keep their labels, shape_rows reads them by label
+    labels = rows[0].keys()[:-1]
+    items = [KeyedTuple(row[:-1], labels) for row in rows]
+    return items, total_results
+
+
+def apply_keyset_pagination(query, *, model, sort_on, sort_order, cursor=None, page_size, request):
+    """Paginate a sorted query by seeking past the last row of the previous page.
+
+    `cursor` is the opaque token returned as `next_cursor` by the previous page,
+    an empty cursor starts at the first page. The query must already be sorted
+    on `sort_on` followed by `uid`, both in `sort_order`. No count query and no
+    OFFSET are issued, so deep pages cost the same as the first one.
+    """
+    if page_size is None or page_size < 1:
+        raise InvalidPage(
+            'Page size should be positive: {}'.format(page_size)
+        )
+
+    if cursor:
+        last_value, last_uid = decode_cursor(cursor, sort_on=sort_on, sort_order=sort_order)
+        sort_field = None if sort_on == 'uid' else Field(model, sort_on).get_sqlalchemy_field()
+        query = query.filter(_seek(sort_field, model.uid, last_value, last_uid, sort_order))
+
+    rows = query.limit(page_size + 1).all()
+    items = rows[:page_size]
+
+    next_cursor = None
+    next_url = None
+    if len(rows) > page_size:
+        last = _row_entity(items[-1])
+        next_cursor = encode_cursor(getattr(last, sort_on), last.uid, sort_on=sort_on, sort_order=sort_order)
+        _minus_query_params = str(request.url).split('?')[0]
+        next_url = f"{_minus_query_params}?cursor={next_cursor}&size={page_size}"
+
+    return {
+        'count': None,
+        'page': None,
+        'items': items,
+        'pages': None,
+        'size': page_size,
+        'next_url': next_url,
+        'prev_url': None,
+        'next_cursor': next_cursor,
+        'count_strategy': None,
+        }
+
+
+def encode_cursor(value, uid, *, sort_on, sort_order):
+    if isinstance(value, datetime):
+        value = {'datetime': value.isoformat()}
+    token = json.dumps([sort_on, sort_order, value, uid], separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *, sort_on, sort_order):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        field, direction, value, uid = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['datetime'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidPage('Invalid cursor: {}'.format(cursor))
+
+    if (field, direction) != (sort_on, sort_order):
+        raise InvalidPage(
+            'Cursor was issued for sort_on={} sort_order={}'.format(field, direction)
+        )
+    return value, uid
+
+
+def _seek(sort_field, uid_field, last_value, last_uid, sort_order):
+    """Rows strictly after (last_value, last_uid) in the given order.
+
+    Follows PostgreSQL's default NULL ordering: NULLS LAST when ascending and
+    NULLS FIRST when descending. A `sort_field` of None seeks on uid alone.
+    """
+    if sort_field is None:
+        return uid_field > last_uid if sort_order == SORT_ASCENDING else uid_field < last_uid
+
+    if sort_order == SORT_ASCENDING:
+        if last_value is None:
+            return and_(sort_field.is_(None), uid_field > last_uid)
+        return or_(
+            sort_field > last_value,
+            and_(sort_field == last_value, uid_field > last_uid),
+            sort_field.is_(None),
+        )
+
+    if sort_order == SORT_DESCENDING:
+        if last_value is None:
+            return or_(
+                and_(sort_field.is_(None), uid_field < last_uid),
+                sort_field.isnot(None),
+            )
+        return or_(
+            sort_field < last_value,
+            and_(sort_field == last_value, uid_field < last_uid),
+        )
+
+    raise InvalidPage('Direction `{}` not valid.'.format(sort_order))
+
+
+def _row_entity(row):
+    # rows of queries with extra columns are tuples led by the model instance,
+    # rows of column queries carry the sort column and uid themselves
+    if isinstance(row, tuple) and hasattr(row[0], '_sa_instance_state'):
+        return row[0]
+    return row
+
+
 def _get_prev(url, page, size):
     _minus_query_params = str(url).split('?')[0]
     
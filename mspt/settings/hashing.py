@@ -0,0 +1,33 @@
+"""
+Password hashing, run in a dedicated process pool so bcrypt never occupies
+the event loop or the request threadpool. Kept free of app imports so pool
+workers start quickly.
+"""
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from mspt.settings import config
+from mspt.utils.pools import BoundedProcessPool
+
+# min/max rounds pinned to the configured cost: hashes of any other cost need an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+hash_pool = BoundedProcessPool(
+    max_workers=config.PASSWORD_HASH_WORKERS, max_pending=config.PASSWORD_HASH_MAX_PENDING
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and return a new hash when `hashed_password` was made with another cost"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
@@ -1,53 +1,125 @@
-from passlib.context import CryptContext
+import hashlib
+import time
+from typing import Optional, Tuple
 import jwt
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError
 from sqlalchemy.orm import Session
-from starlette.status import HTTP_403_FORBIDDEN
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_503_SERVICE_UNAVAILABLE
 
 from mspt.apps.users import crud
 from mspt.settings.utils import get_db
 from mspt.settings import config
 from mspt.settings.jwt import ALGORITHM, TokenPayload
-from mspt.apps.users import models
+from mspt.apps.users import schemas
+from mspt.settings import hashing
+from mspt.settings.hashing import pwd_context  # noqa: F401
+from mspt.utils.cache import TTLCache
+from mspt.utils.metrics import Histogram
+from mspt.utils.pools import PoolSaturated
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/login/access-token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# user_uid -> detached schemas.User snapshot of the authenticated user
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+# sha256(token) -> (verified payload, exp) of access tokens
+token_cache = TTLCache(maxsize=config.TOKEN_CACHE_SIZE, ttl=config.TOKEN_CACHE_TTL)
+
+# Latencies of the login path, password_verify includes waiting for a hashing worker
+login_latency = Histogram()
+password_verify_latency = Histogram()
+
+
+def _hashing_saturated():
+    return HTTPException(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password operations in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    verified, _ = verify_and_update_password(plain_password, hashed_password)
+    return verified
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        with password_verify_latency.time():
+            return hashing.hash_pool.run(hashing.verify_and_update_password, plain_password, hashed_password)
+    except PoolSaturated:
+        raise _hashing_saturated()
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        with password_verify_latency.time():
+            return await hashing.hash_pool.run_async(hashing.verify_and_update_password, plain_password, hashed_password)
+    except PoolSaturated:
+        raise _hashing_saturated()
 
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    try:
+        return hashing.hash_pool.run(hashing.hash_password, password)
+    except PoolSaturated:
+        raise _hashing_saturated()
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    jwt.decode with the verified payload cached per token digest.
+    A cached payload is only served while the token's `exp` is in the future.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        payload, exp = cached
+        if exp is None or time.time() < exp:
+            return payload
+        token_cache.pop(digest)
+
+    payload = jwt.decode(token, config.SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    ttl = None if exp is None else max(0, min(token_cache.ttl, exp - time.time()))
+    token_cache.set(digest, (payload, exp), ttl=ttl)
+    return payload
 
 
 def get_current_user(
     db: Session = Depends(get_db), token: str = Security(reusable_oauth2)
 ):
     try:
-        payload = jwt.decode(token, config.SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         token_data = TokenPayload(**payload)
     except PyJWTError:
         raise HTTPException(
             status_code=HTTP_403_FORBIDDEN, detail="Could not validate credentials"
         )
-    user = crud.user.get(db, uid=token_data.user_uid)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = user_cache.get(token_data.user_uid)
+    if user is None:
+        db_user = crud.user.get(db, uid=token_data.user_uid)
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = schemas.User.from_orm(db_user)
+        user_cache.set(user.uid, user)
     return user
 
 
-def get_current_active_user(current_user:  models.User = Security(get_current_user)):
+def invalidate_cached_user(user_uid: int):
+    """Call whenever a user row changes so the next request reloads it"""
+    user_cache.pop(user_uid)
+
+
+def get_current_active_user(current_user:  schemas.User = Security(get_current_user)):
     if not crud.user.is_active(current_user):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def get_current_active_superuser(current_user: models.User = Security(get_current_user)):
+def get_current_active_superuser(current_user: schemas.User = Security(get_current_user)):
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
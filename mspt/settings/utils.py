@@ -1,10 +1,4 @@
-from starlette.requests import Request
-
-
-def get_db(request: Request):
-    """
-    use when using db_session_middleware in main.py
-    otherwise use get_db in settings.database
-    """
-    return request.state.db
+# Same request-scoped session provider as settings.database.get_db, kept
+# importable from here for the login and security modules.
+from mspt.settings.database.db import get_db  # noqa: F401
 
@@ -0,0 +1,50 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Sequence
+
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Thread-safe latency histogram, observations are in seconds and reported in milliseconds"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self._counts[bisect_left(self.buckets_ms, ms)] += 1
+            self.count += 1
+            self.sum_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ["inf"]
+            return {
+                'count': self.count,
+                'sum_ms': round(self.sum_ms, 3),
+                'avg_ms': round(self.sum_ms / self.count, 3) if self.count else 0,
+                'max_ms': round(self.max_ms, 3),
+                'buckets': dict(zip(labels, self._counts)),
+            }
@@ -0,0 +1,81 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolSaturated(RuntimeError):
+    pass
+
+
+class BoundedProcessPool:
+    """
+    Process pool, started on first use, that refuses new work with
+    `PoolSaturated` once `max_pending` jobs are queued or running.
+    Jobs must be picklable module level functions.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(f"{self.pending} jobs pending")
+            self.pending += 1
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'rejected': self.rejected,
+        }
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # a worker died, start a fresh pool once
+            self.shutdown()
+            return self._get_executor().submit(fn, *args)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, forking a threaded server process is not safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _release(self, *args: Any) -> None:
+        with self._lock:
+            self.pending -= 1
@@ -0,0 +1,27 @@
+"""
+orjson backed JSON responses, the default response class of mspt_app.
+
+FastAPI hands responses their content already through jsonable_encoder, so
+the output matches the compact json.dumps of starlette's JSONResponse. When
+content is passed in raw, datetimes come out in the same ISO 8601 form
+(orjson writes them natively), Decimals as floats like jsonable_encoder
+does, and non string keys as strings.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import responses
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+class ORJSONResponse(responses.ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=OPTIONS)
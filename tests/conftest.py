@@ -0,0 +1,129 @@
+"""
+Fixtures on an in-memory SQLite database, created fresh for every test. Only
+the tables the tested code reads are created, SQLite can not create the
+association tables with composite autoincrement keys.
+
+Queries SQLite can not run (GROUPING SETS, row locks) are tested on the
+PostgreSQL database of TEST_DATABASE_URL, those tests are skipped without it.
+The tables are created and dropped there, use a scratch database.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+# users.crud goes first, as in the app, it and settings.security import each other
+from mspt.apps.users import crud as user_crud  # noqa: F401
+from mspt.apps.mixins.crud import count_cache
+from mspt.apps.mspt import models
+from mspt.apps.users.models import User
+from mspt.settings.database import DBModel
+
+TABLES = (
+    User, models.Instrument, models.Strategy, models.Style, models.Trade, models.Study, models.StudyItem,
+    models.StrategyImage, models.TradeImage, models.StudyItemImage,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    DBModel.metadata.create_all(engine, tables=[model.__table__ for model in TABLES])
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    count_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def pg_db():
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    engine = create_engine(url)
+    DBModel.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    count_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        DBModel.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def owner(db):
+    return add_owner(db)
+
+
+@pytest.fixture
+def pg_owner(pg_db):
+    return add_owner(pg_db)
+
+
+@pytest.fixture
+def trading(db, owner):
+    return add_trading(db, owner)
+
+
+@pytest.fixture
+def pg_trading(pg_db, pg_owner):
+    return add_trading(pg_db, pg_owner)
+
+
+def make_request(path: str = '/test') -> Request:
+    return Request({
+        'type': 'http', 'method': 'GET', 'scheme': 'http', 'server': ('testserver', 80),
+        'path': path, 'query_string': b'', 'headers': [],
+    })
+
+
+def add_owner(db, email: str = 'trader@example.com') -> User:
+    user = User(email=email, first_name='Tess', last_name='Trader', hashed_password='x' * 60)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_trading(db, owner):
+    """Instruments, strategies, styles and a study of `owner`, plus trades and study items over them"""
+    instruments = [models.Instrument(name=f"PAIR{i}", owner_uid=owner.uid) for i in range(3)]
+    strategies = [models.Strategy(name=f"strategy {i}", description='breakouts', owner_uid=owner.uid) for i in range(2)]
+    styles = [models.Style(name=f"style {i}", description='swing', owner_uid=owner.uid) for i in range(2)]
+    study = models.Study(name='study', description='backtest', owner_uid=owner.uid)
+    db.add_all(instruments + strategies + styles + [study])
+    db.flush()
+
+    start = datetime(2020, 1, 1)
+    for i in range(25):
+        db.add(models.Trade(
+            owner_uid=owner.uid,
+            # repeated and missing dates, for the uid tie-breaker and NULL ordering
+            date=None if i % 7 == 0 else start + timedelta(days=i // 3),
+            instrument_uid=instruments[i % 3].uid,
+            strategy_uid=strategies[i % 2].uid,
+            style_uid=styles[i % 2].uid,
+            pips=i % 9,
+            rr=1.5,
+            description=f"trade {i}",
+        ))
+        db.add(models.StudyItem(
+            name=f"item {i}",
+            description=f"item {i}",
+            study_uid=study.uid,
+            instrument_uid=instruments[i % 3].uid,
+            style_uid=styles[i % 2].uid,
+            pips=i % 9,
+            rrr=2.0,
+            date=start + timedelta(days=i // 3),
+        ))
+    db.commit()
+    return {'instruments': instruments, 'strategies': strategies, 'styles': styles, 'study': study}
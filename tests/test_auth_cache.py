@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from mspt.apps.users import crud as user_crud, schemas as user_schemas
+from mspt.settings import security
+from mspt.settings.jwt import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    security.user_cache.clear()
+    security.token_cache.clear()
+    yield
+    security.user_cache.clear()
+    security.token_cache.clear()
+
+
+def _token(user_uid, minutes=15):
+    return create_access_token(data={'user_uid': user_uid}, expires_delta=timedelta(minutes=minutes)).decode()
+
+
+def test_user_is_loaded_once(db, owner):
+    token = _token(owner.uid)
+    user = security.get_current_user(db, token)
+    assert (user.uid, user.email) == (owner.uid, owner.email)
+    # served from the cache, without the session
+    assert security.get_current_user(None, token) == user
+
+
+def test_updates_drop_the_cached_user(db, owner):
+    token = _token(owner.uid)
+    security.get_current_user(db, token)
+    user_crud.user.update(db, db_obj=owner, obj_in=user_schemas.UserUpdate(uid=owner.uid, first_name='Tom'))
+    assert security.user_cache.get(owner.uid) is None
+    assert security.get_current_user(db, token).first_name == 'Tom'
+
+
+def test_unknown_user_is_not_cached(db, owner):
+    with pytest.raises(HTTPException) as exc_info:
+        security.get_current_user(db, _token(owner.uid + 1))
+    assert exc_info.value.status_code == 404
+    assert security.user_cache.get(owner.uid + 1) is None
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Payloads jwt.decode verified, i.e. token cache misses"""
+    decoded = []
+    decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        payload = decode(*args, **kwargs)
+        decoded.append(payload)
+        return payload
+
+    monkeypatch.setattr(security.jwt, 'decode', counting_decode)
+    return decoded
+
+
+def test_token_is_verified_once(decodes):
+    token = _token(1)
+    assert security.decode_access_token(token) == security.decode_access_token(token)
+    assert len(decodes) == 1
+    assert security.decode_access_token(_token(2))['user_uid'] == 2
+    assert len(decodes) == 2
+
+
+def test_cached_payload_expires_with_the_token(decodes, monkeypatch):
+    token = _token(1, minutes=1)
+    payload = security.decode_access_token(token)
+    # a minute and a bit later, the cache entry is past exp
+    now = security.time.time()
+    monkeypatch.setattr(security.time, 'time', lambda: now + 61)
+    security.decode_access_token(token)
+    assert len(decodes) == 2
+    assert payload['exp'] < now + 61
+
+
+def test_invalid_tokens_are_not_cached():
+    token = _token(1)
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+    with pytest.raises(security.PyJWTError):
+        security.decode_access_token(tampered)
+    with pytest.raises(security.PyJWTError):
+        security.decode_access_token(tampered)
+    expired = _token(1, minutes=-1)
+    with pytest.raises(security.PyJWTError):
+        security.decode_access_token(expired)
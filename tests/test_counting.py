@@ -0,0 +1,159 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from mspt.apps.mixins.crud import count_cache
+from mspt.apps.mspt import crud, models
+from mspt.settings.database.sqlalchemy_filters.counting import (
+    COUNT_CACHED, COUNT_ESTIMATE, COUNT_EXACT, COUNT_WINDOW, count_results, estimate_count,
+)
+from mspt.settings.database.sqlalchemy_filters.pagination2 import apply_pagination
+from mspt.utils.cache import TTLCache
+
+from .conftest import add_owner, make_request
+
+
+def _trades(db, owner):
+    return db.query(models.Trade).filter(models.Trade.owner_uid == owner.uid).order_by(models.Trade.uid)
+
+
+def test_exact(db, owner, trading):
+    assert count_results(_trades(db, owner)) == (25, COUNT_EXACT)
+
+
+def test_cached_counts_on_a_miss_only(db, owner, trading):
+    cache = TTLCache(ttl=60)
+    assert count_results(_trades(db, owner), COUNT_CACHED, cache=cache, cache_key='trades') == (25, COUNT_EXACT)
+    assert cache.get('trades') == 25
+    # a hit is returned as stored, without counting
+    cache.set('trades', 99)
+    assert count_results(_trades(db, owner), COUNT_CACHED, cache=cache, cache_key='trades') == (99, COUNT_CACHED)
+
+
+def test_estimate_off_postgresql_counts_exactly(db, owner, trading):
+    assert estimate_count(_trades(db, owner)) is None
+    assert count_results(_trades(db, owner), COUNT_ESTIMATE, estimate_threshold=0) == (25, COUNT_EXACT)
+
+
+def test_estimate_on_postgresql(pg_db, pg_owner, pg_trading):
+    pg_db.execute('ANALYZE trade')
+    assert estimate_count(_trades(pg_db, pg_owner)) == 25
+    assert count_results(_trades(pg_db, pg_owner), COUNT_ESTIMATE, estimate_threshold=10) == (25, COUNT_ESTIMATE)
+    # below the threshold the estimate is too coarse to show
+    assert count_results(_trades(pg_db, pg_owner), COUNT_ESTIMATE, estimate_threshold=1000) == (25, COUNT_EXACT)
+
+
+def test_estimated_pages_look_ahead_for_next_url(pg_db, pg_owner, pg_trading):
+    pg_db.execute('ANALYZE trade')
+
+    def page(number):
+        return apply_pagination(
+            _trades(pg_db, pg_owner), page_number=number, page_size=10, request=make_request(),
+            count_strategy=COUNT_ESTIMATE, estimate_threshold=10,
+        )
+
+    first = page(1)
+    assert (first['count_strategy'], first['count'], first['pages']) == (COUNT_ESTIMATE, 25, 3)
+    assert len(first['items']) == 10
+    assert first['next_url'].endswith('?page=2&size=10')
+    # the last page makes the total exact
+    last = page(3)
+    assert (last['count_strategy'], last['count'], last['pages']) == (COUNT_EXACT, 25, 3)
+    assert len(last['items']) == 5
+    assert last['next_url'] is None
+    past = page(5)
+    assert past['items'] == []
+    assert past['next_url'] is None
+
+
+def test_writes_drop_the_cached_totals_of_their_owner(db, owner, trading):
+    other = add_owner(db, email='other@example.com')
+
+    def listing(owner_uid):
+        return crud.trade.get_paginated_multi(db, request=make_request(), owner_uid=owner_uid, size=10)
+
+    key = crud.trade._count_key(owner_uid=owner.uid)
+    other_key = crud.trade._count_key(owner_uid=other.uid)
+    assert listing(owner.uid)['count'] == 25
+    assert listing(other.uid)['count'] == 0
+    assert count_cache.get(key) == 25
+
+    # cached totals are served until a write drops them
+    count_cache.set(key, 99)
+    assert listing(owner.uid)['count'] == 99
+
+    crud.trade.remove(db, uid=_trades(db, owner).first().uid)
+    assert count_cache.get(key) is None
+    assert count_cache.get(other_key) == 0
+    assert listing(owner.uid)['count'] == 24
+
+
+@contextmanager
+def _statements(db):
+    """Counts the statements `db` sends while the block runs"""
+    sent = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        sent.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield sent
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _page(query, number, strategy=COUNT_WINDOW, **kwargs):
+    return apply_pagination(
+        query, page_number=number, page_size=10, request=make_request(), count_strategy=strategy, **kwargs
+    )
+
+
+def test_window_fetches_page_and_total_together(db, owner, trading):
+    query = _trades(db, owner)
+    with _statements(db) as sent:
+        page = _page(query, 2)
+    assert len(sent) == 1
+    assert (page['count_strategy'], page['count'], page['pages']) == (COUNT_WINDOW, 25, 3)
+    assert [trade.uid for trade in page['items']] == [trade.uid for trade in _trades(db, owner)[10:20]]
+
+
+def test_window_rows_of_column_queries(db, owner, trading):
+    query = db.query(models.Trade.uid, models.Trade.pips).filter(models.Trade.owner_uid == owner.uid).order_by(models.Trade.uid)
+    page = _page(query, 1)
+    assert page['count'] == 25
+    assert [tuple(row) for row in page['items']] == [tuple(row) for row in query[:10]]
+    assert page['items'][0].keys() == ['uid', 'pips']
+
+
+def test_window_past_the_last_page(db, owner, trading):
+    page = _page(_trades(db, owner), 4)
+    assert (page['items'], page['count'], page['pages']) == ([], 25, 3)
+    assert page['next_url'] is None
+    empty = _page(_trades(db, owner).filter(models.Trade.uid < 0), 1)
+    assert (empty['items'], empty['count'], empty['next_url']) == ([], 0, None)
+
+
+def test_cache_miss_is_counted_with_the_page(db, owner, trading):
+    cache = TTLCache(ttl=60)
+    query = _trades(db, owner)
+    with _statements(db) as sent:
+        page = _page(query, 1, COUNT_CACHED, count_cache=cache, count_key='trades')
+    assert len(sent) == 1
+    assert (page['count_strategy'], page['count']) == (COUNT_WINDOW, 25)
+    assert cache.get('trades') == 25
+    page = _page(_trades(db, owner), 1, COUNT_CACHED, count_cache=cache, count_key='trades')
+    assert (page['count_strategy'], page['count']) == (COUNT_CACHED, 25)
+
+
+def test_unestimated_listings_use_the_window(db, owner, trading):
+    # nothing to estimate with on SQLite
+    page = _page(_trades(db, owner), 1, COUNT_ESTIMATE, estimate_threshold=0)
+    assert (page['count_strategy'], page['count']) == (COUNT_WINDOW, 25)
+
+
+def test_small_listings_use_the_window(pg_db, pg_owner, pg_trading):
+    pg_db.execute('ANALYZE trade')
+    page = _page(_trades(pg_db, pg_owner), 1, COUNT_ESTIMATE, estimate_threshold=1000)
+    assert (page['count_strategy'], page['count']) == (COUNT_WINDOW, 25)
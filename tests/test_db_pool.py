@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from mspt.settings.database.pool import MeteredQueuePool, pool_metrics
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def test_checkouts_are_timed(engine):
+    before = pool_metrics.checkout_latency.count
+    with engine.connect():
+        snapshot = pool_metrics.snapshot(engine.pool)
+        assert (snapshot['size'], snapshot['checked_out'], snapshot['checked_in']) == (1, 1, 0)
+    assert pool_metrics.checkout_latency.count == before + 1
+    assert pool_metrics.snapshot(engine.pool)['checked_in'] == 1
+
+
+def test_timeouts_are_counted(engine):
+    timeouts = pool_metrics.timeouts
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    assert pool_metrics.timeouts == timeouts + 1
+    latency = pool_metrics.snapshot(engine.pool)['checkout_latency']
+    # the timed out checkout waited for pool_timeout
+    assert latency['max_ms'] >= 100
@@ -0,0 +1,112 @@
+"""Images sharing one stored asset by content hash, on PostgreSQL (row locks, DISTINCT ON, RETURNING)"""
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from mspt.apps.mspt import models, utils
+from mspt.apps.mspt.storage import StorageBackend
+
+
+class RecordingBackend(StorageBackend):
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, public_uid):
+        self.deleted.append(public_uid)
+        return True
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(utils, 'get_backend', lambda: backend)
+    return backend
+
+
+def _image(content_hash='a' * 64, public_uid='trade/chart'):
+    return {
+        'url': f"https://images.example.com/{public_uid}",
+        'public_uid': public_uid,
+        'content_hash': content_hash,
+        'variants': [{'width': 320, 'format': 'webp', 'public_uid': f"{public_uid}-320w"}],
+    }
+
+
+def _trades(db):
+    return [trade.uid for trade in db.query(models.Trade).order_by(models.Trade.uid).limit(2)]
+
+
+def test_assets_are_found_by_content(pg_db, pg_trading):
+    first, _ = _trades(pg_db)
+    utils.persist_images_metadata(pg_db, 'trade', str(first), [_image()])
+
+    assets = utils.find_assets(pg_db, ['a' * 64, 'b' * 64])
+    assert list(assets) == ['a' * 64]
+    assert assets['a' * 64]['public_uid'] == 'trade/chart'
+    assert assets['a' * 64]['url'] == 'https://images.example.com/trade/chart'
+
+
+def test_content_is_attached_to_a_parent_once(pg_db, pg_trading):
+    first, _ = _trades(pg_db)
+    uids = utils.persist_images_metadata(pg_db, 'trade', str(first), [_image(), _image()])
+    assert uids[0] == uids[1]
+    assert utils.persist_images_metadata(pg_db, 'trade', str(first), [_image()]) == uids[:1]
+    assert pg_db.query(models.TradeImage).count() == 1
+
+
+def test_only_the_last_reference_deletes_the_asset(pg_db, pg_trading, backend):
+    first, second = _trades(pg_db)
+    [kept] = utils.persist_images_metadata(pg_db, 'trade', str(first), [_image()])
+    [reusing] = utils.persist_images_metadata(pg_db, 'trade', str(second), [_image()], reused=['trade/chart'])
+
+    assert utils.delete_images(pg_db, 'trade', str(reusing)) == {'result': 'ok'}
+    assert backend.deleted == []
+    assert utils.delete_images(pg_db, 'trade', str(kept)) == {'result': 'ok'}
+    assert backend.deleted == ['trade/chart-320w', 'trade/chart']
+    assert pg_db.query(models.TradeImage).count() == 0
+
+
+def test_reusing_a_deleted_asset_stores_nothing(pg_db, pg_trading):
+    first, _ = _trades(pg_db)
+    with pytest.raises(utils.AssetGone) as exc_info:
+        utils.persist_images_metadata(pg_db, 'trade', str(first), [_image()], reused=['trade/chart'])
+    assert exc_info.value.public_uids == {'trade/chart'}
+    assert pg_db.query(models.TradeImage).count() == 0
+
+
+def test_reuse_waits_for_a_delete_in_progress(pg_db, pg_trading, backend):
+    first, second = _trades(pg_db)
+    [image_uid] = utils.persist_images_metadata(pg_db, 'trade', str(first), [_image()])
+    Session = sessionmaker(bind=pg_db.get_bind())
+    deleting, reusing = Session(), Session()
+
+    # the delete holds the asset's images locked, as delete_images does until it commits
+    image = deleting.query(models.TradeImage).get(image_uid)
+    utils._lock_assets(deleting, ['trade/chart'])
+    deleting.delete(image)
+    deleting.flush()
+
+    outcome = {}
+
+    def reuse():
+        try:
+            outcome['uids'] = utils.persist_images_metadata(
+                reusing, 'trade', str(second), [_image()], reused=['trade/chart']
+            )
+        except utils.AssetGone as exc:
+            outcome['gone'] = exc.public_uids
+
+    thread = threading.Thread(target=reuse)
+    thread.start()
+    thread.join(0.5)
+    # blocked on the lock
+    assert thread.is_alive()
+    deleting.commit()
+    thread.join(5)
+
+    assert outcome == {'gone': {'trade/chart'}}
+    deleting.close()
+    reusing.close()
+    pg_db.expire_all()
+    assert pg_db.query(models.TradeImage).count() == 0
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from mspt.apps.mspt import models
+from mspt.settings.database.sqlalchemy_filters import apply_keyset_pagination
+from mspt.settings.database.sqlalchemy_filters.exceptions import InvalidPage
+from mspt.settings.database.sqlalchemy_filters.pagination2 import decode_cursor, encode_cursor
+
+from .conftest import make_request
+
+
+def _ordered(db, sort_on, sort_order):
+    """Trades in PostgreSQL's default NULL order, which SQLite has to be told"""
+    field = getattr(models.Trade, sort_on)
+    if sort_order == 'asc':
+        return db.query(models.Trade).order_by(field.asc().nullslast(), models.Trade.uid.asc())
+    return db.query(models.Trade).order_by(field.desc().nullsfirst(), models.Trade.uid.desc())
+
+
+def _walk(db, sort_on, sort_order, size):
+    uids, cursor = [], ''
+    while cursor is not None:
+        page = apply_keyset_pagination(
+            _ordered(db, sort_on, sort_order),
+            model=models.Trade,
+            sort_on=sort_on,
+            sort_order=sort_order,
+            cursor=cursor,
+            page_size=size,
+            request=make_request(),
+        )
+        assert len(page['items']) <= size
+        uids.extend(trade.uid for trade in page['items'])
+        cursor = page['next_cursor']
+    return uids
+
+
+@pytest.mark.parametrize('value', [None, 42, 1.5, 'EURUSD', datetime(2020, 3, 1, 8, 30, 15, 250000)])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor(value, 7, sort_on='date', sort_order='desc')
+    assert '=' not in cursor
+    assert decode_cursor(cursor, sort_on='date', sort_order='desc') == (value, 7)
+
+
+def test_cursor_is_bound_to_its_sort():
+    cursor = encode_cursor(3, 7, sort_on='pips', sort_order='asc')
+    with pytest.raises(InvalidPage):
+        decode_cursor(cursor, sort_on='pips', sort_order='desc')
+    with pytest.raises(InvalidPage):
+        decode_cursor(cursor, sort_on='rr', sort_order='asc')
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'e30', encode_cursor(1, 2, sort_on='uid', sort_order='asc')[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidPage):
+        decode_cursor(cursor, sort_on='uid', sort_order='asc')
+
+
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+@pytest.mark.parametrize('sort_on', ['uid', 'date', 'pips'])
+@pytest.mark.parametrize('size', [1, 4, 25, 30])
+def test_pages_cover_the_listing_once_in_order(db, trading, sort_on, sort_order, size):
+    expected = [trade.uid for trade in _ordered(db, sort_on, sort_order)]
+    assert _walk(db, sort_on, sort_order, size) == expected
+
+
+def test_seek_past_a_null_sort_value(db, trading):
+    nulls = [trade.uid for trade in _ordered(db, 'date', 'asc') if trade.date is None]
+    assert len(nulls) > 1
+    # ascending, NULLs come last: after the first NULL only the NULLs with a greater uid remain
+    page = apply_keyset_pagination(
+        _ordered(db, 'date', 'asc'),
+        model=models.Trade,
+        sort_on='date',
+        sort_order='asc',
+        cursor=encode_cursor(None, nulls[0], sort_on='date', sort_order='asc'),
+        page_size=100,
+        request=make_request(),
+    )
+    assert [trade.uid for trade in page['items']] == nulls[1:]
+    assert page['next_cursor'] is None
+
+
+def test_equal_sort_values_are_split_by_uid(db, trading):
+    # three trades a day, a page boundary inside a day must neither skip nor repeat one
+    day = [trade.uid for trade in _ordered(db, 'date', 'desc') if trade.date == datetime(2020, 1, 5)]
+    assert len(day) > 1
+    page = apply_keyset_pagination(
+        _ordered(db, 'date', 'desc'),
+        model=models.Trade,
+        sort_on='date',
+        sort_order='desc',
+        cursor=encode_cursor(datetime(2020, 1, 5), day[0], sort_on='date', sort_order='desc'),
+        page_size=len(day) - 1,
+        request=make_request(),
+    )
+    assert [trade.uid for trade in page['items']] == day[1:]
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+from mspt.settings import config, hashing, security
+from mspt.utils.pools import BoundedProcessPool, PoolSaturated
+
+
+@pytest.fixture
+def pool():
+    pool = BoundedProcessPool(max_workers=1, max_pending=1)
+    try:
+        yield pool
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    monkeypatch.setattr(hashing, 'hash_pool', BoundedProcessPool(max_workers=1, max_pending=0))
+
+
+def test_pool_refuses_work_beyond_max_pending(pool):
+    running = pool.submit(time.sleep, 0.5)
+    with pytest.raises(PoolSaturated):
+        pool.submit(time.sleep, 0)
+    assert pool.stats()['rejected'] == 1
+    running.result()
+    # the slot is released by a done callback, right after the result
+    for _ in range(100):
+        if pool.pending == 0:
+            break
+        time.sleep(0.01)
+    assert pool.run(abs, -1) == 1
+
+
+def test_hashes_are_made_and_verified_in_the_pool():
+    try:
+        hashed = security.get_password_hash('secret')
+        assert bcrypt.from_string(hashed).rounds == config.BCRYPT_ROUNDS
+        assert security.verify_and_update_password('secret', hashed) == (True, None)
+        assert security.verify_password('wrong', hashed) is False
+    finally:
+        hashing.hash_pool.shutdown()
+
+
+def test_hashes_of_another_cost_are_updated():
+    try:
+        verified, new_hash = security.verify_and_update_password('secret', bcrypt.using(rounds=4).hash('secret'))
+        assert verified
+        assert bcrypt.from_string(new_hash).rounds == config.BCRYPT_ROUNDS
+    finally:
+        hashing.hash_pool.shutdown()
+
+
+def test_saturated_pool_answers_503(saturated):
+    hashed = bcrypt.using(rounds=4).hash('secret')
+    for call in (
+        lambda: security.get_password_hash('secret'),
+        lambda: security.verify_and_update_password('secret', hashed),
+        lambda: asyncio.run(security.verify_and_update_password_async('secret', hashed)),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            call()
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {'Retry-After': '1'}
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+from databases import Database
+
+from mspt.apps.mspt import crud, models
+
+
+def _journal(db, owner):
+    instruments = [models.Instrument(name=f"PAIR{i}", owner_uid=owner.uid) for i in range(2)]
+    strategy = models.Strategy(name='strategy', description='breakouts', owner_uid=owner.uid)
+    style = models.Style(name='style', description='swing', owner_uid=owner.uid)
+    db.add_all(instruments + [strategy, style])
+    db.flush()
+    # (instrument, position, outcome, status, pips); status True is an open trade
+    trades = [
+        (0, True, True, False, 30),
+        (0, True, False, False, -10),
+        (0, False, True, False, 20),
+        (1, True, False, False, -20),
+        # open, no outcome yet
+        (1, True, False, True, 5),
+        (0, False, False, True, -5),
+    ]
+    for instrument, position, outcome, status, pips in trades:
+        db.add(models.Trade(
+            owner_uid=owner.uid, instrument_uid=instruments[instrument].uid, strategy_uid=strategy.uid,
+            style_uid=style.uid, position=position, outcome=outcome, status=status, pips=pips, rr=2.0,
+        ))
+    db.commit()
+    return instruments
+
+
+def test_only_closed_trades_are_counted(pg_db, pg_owner):
+    instruments = _journal(pg_db, pg_owner)
+    stats = crud.trade.get_statistics(pg_db, owner_uid=pg_owner.uid)
+
+    overall = stats['overall']
+    assert (overall['total_trades'], overall['won_trades'], overall['lost_trades']) == (4, 2, 2)
+    assert overall['win_rate'] == 50.0
+    assert overall['total_pips'] == 20
+    assert overall['avg_pips_won'] == 25.0
+    assert overall['avg_pips_lost'] == -15.0
+
+    by_instrument = {row['instrument_uid']: row for row in stats['by_instrument']}
+    assert by_instrument[instruments[1].uid]['total_trades'] == 1
+    assert by_instrument[instruments[1].uid]['win_rate'] == 0.0
+    assert round(by_instrument[instruments[0].uid]['win_rate'], 2) == 66.67
+
+    by_position = {row['position']: row['total_trades'] for row in stats['by_position']}
+    assert by_position == {True: 3, False: 1}
+
+
+def test_no_closed_trades(pg_db, pg_owner):
+    stats = crud.trade.get_statistics(pg_db, owner_uid=pg_owner.uid)
+    assert stats['overall']['total_trades'] == 0
+    assert stats['overall']['win_rate'] == 0
+    assert stats['by_instrument'] == []
+
+
+def test_async_matches_sync(pg_db, pg_owner):
+    _journal(pg_db, pg_owner)
+
+    async def statistics():
+        database = Database(os.environ['TEST_DATABASE_URL'])
+        await database.connect()
+        try:
+            async with database.connection() as connection:
+                return await crud.trade.get_statistics_async(connection, owner_uid=pg_owner.uid)
+        finally:
+            await database.disconnect()
+
+    # asyncpg binds parameters with types inferred by the server, unlike psycopg2
+    assert asyncio.run(statistics()) == crud.trade.get_statistics(pg_db, owner_uid=pg_owner.uid)
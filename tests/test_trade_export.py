@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from mspt.apps.mspt import crud, models, trade_io
+from mspt.settings import config
+
+from .conftest import add_owner
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Chunks of an export from the session's database, read 10 rows at a time"""
+    monkeypatch.setattr(config, 'TRADE_EXPORT_BATCH_SIZE', 10)
+
+    def export(db, owner, fmt):
+        monkeypatch.setattr(trade_io, 'SessionLocal', sessionmaker(bind=db.get_bind()))
+        return list(trade_io.export_trades(owner.uid, fmt))
+    return export
+
+
+@pytest.fixture
+def other_trade(db, trading):
+    # trades of other users are never exported
+    other = add_owner(db, email='other@example.com')
+    db.add(models.Trade(
+        owner_uid=other.uid,
+        instrument_uid=trading['instruments'][0].uid,
+        strategy_uid=trading['strategies'][0].uid,
+        style_uid=trading['styles'][0].uid,
+        description='not mine',
+    ))
+    db.commit()
+
+
+def _expected(db, owner):
+    return db.query(models.Trade).filter(models.Trade.owner_uid == owner.uid).order_by(models.Trade.uid).all()
+
+
+def test_csv(db, owner, trading, other_trade, exported):
+    chunks = exported(db, owner, trade_io.EXPORT_CSV)
+    # the header with the first batch, then one chunk per batch of 10 and the rest of the buffer
+    assert len(chunks) == 4
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert rows[0] == list(crud.EXPORT_COLUMNS)
+
+    records = [dict(zip(rows[0], row)) for row in rows[1:]]
+    trades = _expected(db, owner)
+    assert [int(record['uid']) for record in records] == [trade.uid for trade in trades]
+    for record, trade in zip(records, trades):
+        assert record['instrument'] == trade.instrument.name
+        assert record['strategy'] == trade.strategy.name
+        assert record['date'] == (trade.date.isoformat() if trade.date else '')
+        assert record['description'] == trade.description
+        assert record['status'] in ('true', 'false')
+
+
+def test_ndjson(db, owner, trading, other_trade, exported):
+    chunks = exported(db, owner, trade_io.EXPORT_NDJSON)
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    trades = _expected(db, owner)
+    assert [record['uid'] for record in records] == [trade.uid for trade in trades]
+    for record, trade in zip(records, trades):
+        assert list(record) == list(crud.EXPORT_COLUMNS)
+        assert record['style'] == trade.style.name
+        assert record['date'] == (trade.date.isoformat() if trade.date else None)
+        assert record['pips'] == trade.pips
+
+
+def test_parquet(db, owner, trading, other_trade, exported):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet  # noqa: F401
+
+    chunks = exported(db, owner, trade_io.EXPORT_PARQUET)
+    parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(b''.join(chunks)))
+    # a row group per batch
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == list(crud.EXPORT_COLUMNS)
+    assert table.schema.field('date').type == pyarrow.timestamp('us')
+    assert table.schema.field('public').type == pyarrow.bool_()
+
+    trades = _expected(db, owner)
+    assert table.column('uid').to_pylist() == [trade.uid for trade in trades]
+    assert table.column('date').to_pylist() == [trade.date for trade in trades]
+    assert table.column('instrument').to_pylist() == [trade.instrument.name for trade in trades]
+
+
+def test_no_trades(db, owner, exported):
+    assert exported(db, owner, trade_io.EXPORT_CSV) == [','.join(crud.EXPORT_COLUMNS) + '\r\n']
+    assert exported(db, owner, trade_io.EXPORT_NDJSON) == []
+
+
+def test_rows_come_from_a_server_side_cursor(pg_db, pg_owner, pg_trading, exported):
+    cursors = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM trade' in statement:
+            cursors.append(cursor.name)
+
+    engine = pg_db.get_bind()
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        chunks = exported(pg_db, pg_owner, trade_io.EXPORT_NDJSON)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert len(''.join(chunks).splitlines()) == 25
+    # psycopg2 names the cursors it keeps open on the server
+    assert len(cursors) == 1 and cursors[0]
+
+
+def test_unknown_format():
+    with pytest.raises(HTTPException) as exc_info:
+        trade_io.check_export_format('xlsx')
+    assert exc_info.value.status_code == 400
+
+
+def test_parquet_needs_pyarrow(monkeypatch):
+    monkeypatch.setattr(trade_io, 'pyarrow', None)
+    with pytest.raises(HTTPException) as exc_info:
+        trade_io.check_export_format(trade_io.EXPORT_PARQUET)
+    assert exc_info.value.status_code == 501
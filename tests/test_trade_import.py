@@ -0,0 +1,80 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from mspt.apps.mspt import crud, models, trade_io
+
+
+def _import(db, owner, data: bytes, fmt: str, chunk_size: int = 1000):
+    rows = trade_io.read_trade_rows(io.BytesIO(data), fmt)
+    return crud.trade.import_trades(db, rows=rows, owner_uid=owner.uid, chunk_size=chunk_size)
+
+
+def test_csv_report(db, owner, trading):
+    data = (
+        "\ufeffdate,instrument,strategy,style,pips,rr,outcome\r\n"
+        "2021-02-01T10:00:00,pair0,Strategy 1,style 0,12,1.5,true\r\n"
+        "2021-02-02T10:00:00,NOPE,strategy 1,style 0,3,,false\r\n"
+        "2021-02-03T10:00:00,PAIR1,,style 1,3,,false\r\n"
+        "2021-02-04T10:00:00,PAIR2,strategy 0,style 1,many,2,false\r\n"
+        ",PAIR2,strategy 0,style 1,,,\r\n"
+    ).encode()
+    report = _import(db, owner, data, trade_io.FORMAT_CSV)
+
+    assert report['imported'] == 2
+    assert report['failed'] == 3
+    # row numbers are file lines, the header is line 1
+    assert report['errors'] == [
+        {'row': 3, 'errors': ["instrument: unknown instrument 'NOPE'"]},
+        {'row': 4, 'errors': ['strategy: a name or strategy_uid is required']},
+        {'row': 5, 'errors': ['pips: value is not a valid integer']},
+    ]
+    imported = db.query(models.Trade).filter(models.Trade.description.is_(None)).order_by(models.Trade.uid).all()
+    assert [(trade.pips, trade.instrument_uid) for trade in imported] == [
+        (12, trading['instruments'][0].uid),
+        (None, trading['instruments'][2].uid),
+    ]
+    assert all(trade.owner_uid == owner.uid for trade in imported)
+
+
+def test_jsonl_report(db, owner, trading):
+    strategy_uid = trading['strategies'][0].uid
+    data = (
+        f'{{"instrument": "PAIR0", "strategy_uid": {strategy_uid}, "style": "style 0", "pips": 4}}\n'
+        '\n'
+        '{"instrument": "PAIR0", \n'
+        '["not", "an", "object"]\n'
+        f'{{"instrument": "PAIR1", "strategy_uid": 999, "style": "style 1"}}\n'
+    ).encode()
+    report = _import(db, owner, data, trade_io.FORMAT_JSONL)
+
+    assert report['imported'] == 1
+    assert [error['row'] for error in report['errors']] == [3, 4, 5]
+    assert report['errors'][0]['errors'][0].startswith('Invalid JSON')
+    assert report['errors'][1]['errors'] == ['Expected a JSON object']
+    assert report['errors'][2]['errors'] == ['strategy_uid: unknown strategy 999']
+
+
+def test_rows_are_inserted_in_chunks(db, owner, trading):
+    line = '{"instrument": "PAIR0", "strategy": "strategy 0", "style": "style 0"}\n'
+    before = db.query(models.Trade).count()
+    report = _import(db, owner, (line * 5).encode(), trade_io.FORMAT_JSONL, chunk_size=2)
+    assert report == {'imported': 5, 'failed': 0, 'errors': []}
+    assert db.query(models.Trade).count() == before + 5
+
+
+@pytest.mark.parametrize('data, fmt, detail', [
+    (b'instrument,strategy,style\nPAIR0,strategy 0,style 0\nPAIR0,strat\xe9gie,style 0\n', 'csv', 'Line 3 is not valid UTF-8'),
+    (b'instrument,strategy,style\nPAIR0,strategy 0,style 0\nPAIR0,"strategy\x00",style 0\n', 'csv', 'Malformed CSV'),
+    (b'{"instrument": "PAIR0", "strategy": "strategy 0", "style": "style 0"}\n\xff\n', 'jsonl', 'Line 2 is not valid UTF-8'),
+])
+def test_unreadable_file_is_rejected_whole(db, owner, trading, data, fmt, detail):
+    before = db.query(models.Trade).count()
+    with pytest.raises(HTTPException) as exc_info:
+        _import(db, owner, data, fmt, chunk_size=1)
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail.startswith(detail)
+    # get_db closes the session without committing
+    db.rollback()
+    assert db.query(models.Trade).count() == before
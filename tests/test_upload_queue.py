@@ -0,0 +1,172 @@
+"""The upload queue against PostgreSQL (image metadata is stored with INSERT .. RETURNING) and a fake backend"""
+import asyncio
+import io
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import UploadFile
+
+from cloudinary.exceptions import Error as CloudError
+
+from mspt.apps.mspt import models, storage, uploads
+from mspt.apps.mspt.storage import StorageBackend, UploadError
+from mspt.settings import config
+
+
+class FakeBackend(StorageBackend):
+    """
+    Stores nothing, fails the uploads of the contents in `failing`, raises the
+    `errors` of a content on its first uploads. Every upload takes `delay` seconds.
+    """
+
+    def __init__(self, failing=(), errors=None, delay=0):
+        self.failing = set(failing)
+        self.errors = {content: list(raised) for content, raised in (errors or {}).items()}
+        self.delay = delay
+        self.uploads = []
+        self.in_flight = self.most_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upload(self, file_path, *, tags, caption, parent):
+        with open(file_path, 'rb') as staged:
+            content = staged.read()
+        with self._lock:
+            self.uploads.append(content)
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            public_uid = f"{parent}/{len(self.uploads)}"
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if content in self.failing:
+            raise RuntimeError('upload refused')
+        if self.errors.get(content):
+            raise self.errors[content].pop(0)
+        return {'url': f"https://images.example.com/{public_uid}", 'public_uid': public_uid}
+
+    def delete(self, public_uid):
+        return True
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'resolve_media_dirs_for', lambda parent: f"{tmp_path}/")
+    monkeypatch.setattr(config, 'IMAGE_VARIANT_WIDTHS', [])
+    monkeypatch.setattr(config, 'UPLOAD_RETRY_BACKOFF', 0)
+    return tmp_path
+
+
+@pytest.fixture
+def trade(pg_db, pg_trading, media, monkeypatch):
+    monkeypatch.setattr(uploads, 'SessionLocal', sessionmaker(bind=pg_db.get_bind()))
+    return pg_db.query(models.Trade).first()
+
+
+def _upload(backend, trade, contents):
+    """Queue `contents` as one upload to `trade` and wait for the job to finish"""
+    queue = uploads.UploadQueue(workers=2, backend=backend)
+
+    async def run():
+        await queue.start()
+        try:
+            files = [UploadFile(f"chart-{i}.png", file=io.BytesIO(content)) for i, content in enumerate(contents)]
+            job = await queue.submit(files, parent='trade', parent_uid=str(trade.uid), tags='eurusd', caption='entry')
+            await queue._queue.join()
+            return job
+        finally:
+            await queue.stop()
+
+    return asyncio.run(run())
+
+
+def _images(db, trade):
+    db.expire_all()
+    return db.query(models.TradeImage).filter(models.TradeImage.trade_uid == trade.uid).order_by(models.TradeImage.uid).all()
+
+
+def test_job_stores_every_image(pg_db, trade, media):
+    backend = FakeBackend()
+    job = _upload(backend, trade, [b'one', b'two'])
+
+    assert job['status'] == uploads.JOB_DONE
+    assert [staged['status'] for staged in job['files']] == [uploads.JOB_DONE] * 2
+    images = _images(pg_db, trade)
+    assert [image.uid for image in images] == [staged['image_uid'] for staged in job['files']]
+    assert sorted(backend.uploads) == [b'one', b'two']
+    # stored remotely, nothing stays staged
+    assert os.listdir(media) == []
+
+
+def test_failed_upload_removes_its_staged_file(pg_db, trade, media):
+    job = _upload(FakeBackend(failing=[b'bad']), trade, [b'good', b'bad'])
+
+    assert job['status'] == uploads.JOB_FAILED
+    good, bad = job['files']
+    assert good['status'] == uploads.JOB_DONE
+    assert (bad['status'], bad['error']) == (uploads.JOB_FAILED, 'upload refused')
+    assert len(_images(pg_db, trade)) == 1
+    assert os.listdir(media) == []
+
+
+def test_stored_content_is_reused(pg_db, trade, media):
+    backend = FakeBackend()
+    _upload(backend, trade, [b'one'])
+    other = pg_db.query(models.Trade).filter(models.Trade.uid != trade.uid).first()
+    job = _upload(backend, other, [b'one', b'one'])
+
+    assert [staged['reused'] for staged in job['files']] == [True, True]
+    assert backend.uploads == [b'one']
+    # one image for the content, it is not attached twice
+    assert len(_images(pg_db, other)) == 1
+    assert os.listdir(media) == []
+
+
+def test_files_of_a_job_upload_concurrently(pg_db, trade, media):
+    backend = FakeBackend(delay=0.2)
+    contents = [b'one', b'two', b'three', b'four', b'two']
+    job = _upload(backend, trade, contents)
+
+    assert job['status'] == uploads.JOB_DONE
+    # as many at once as the queue has workers, each content once
+    assert backend.most_in_flight == 2
+    assert sorted(backend.uploads) == sorted(set(contents))
+    assert [staged['reused'] for staged in job['files']] == [False, False, False, False, True]
+    # stored in the order of the files, the copy of two gets the image of two
+    uids = [staged['image_uid'] for staged in job['files']]
+    assert uids[:4] == [image.uid for image in _images(pg_db, trade)]
+    assert uids[4] == uids[1]
+
+
+def test_answered_errors_are_retried(pg_db, trade, media):
+    backend = FakeBackend(errors={b'one': [UploadError('Rate Limit Exceeded', retryable=True)]})
+    job = _upload(backend, trade, [b'one'])
+    assert (job['status'], job['files'][0]['attempts']) == (uploads.JOB_DONE, 2)
+
+
+def test_unknown_outcomes_are_not_retried(pg_db, trade, media):
+    backend = FakeBackend(errors={b'one': [UploadError('Socket error: timeout()')]})
+    job = _upload(backend, trade, [b'one'])
+    assert (job['status'], job['files'][0]['attempts']) == (uploads.JOB_FAILED, 1)
+    assert backend.uploads == [b'one']
+    assert os.listdir(media) == []
+
+
+@pytest.mark.parametrize('message, retryable', [
+    ('Rate Limit Exceeded', True),
+    ('Error parsing server response (502) - b\'<html>\'', True),
+    ("Socket error: timeout('The read operation timed out')", False),
+    ("Unexpected error - ReadTimeoutError(\"HTTPSConnectionPool(host='api.cloudinary.com', port=443): Read timed out.\")", False),
+])
+def test_cloudinary_errors(monkeypatch, tmp_path, message, retryable):
+    def refuse(*args, **kwargs):
+        raise CloudError(message)
+
+    monkeypatch.setattr(storage, 'CloudLargeUploader', refuse)
+    with pytest.raises(UploadError) as exc_info:
+        storage.CloudinaryBackend().upload(str(tmp_path / 'chart.png'), tags='', caption='', parent='trade')
+    assert exc_info.value.retryable is retryable
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import pytest
+from PIL import Image
+
+from mspt.apps.mspt import variants
+from mspt.apps.mspt.storage import StorageBackend
+from mspt.settings import config
+
+
+class RecordingBackend(StorageBackend):
+    """Stores nothing, refuses the paths ending with one of `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = tuple(failing)
+        self.stored = []
+
+    def upload(self, file_path, *, tags, caption, parent):
+        if file_path.endswith(self.failing):
+            raise RuntimeError('upload refused')
+        self.stored.append(file_path)
+        return {'url': f"https://images.example.com/{os.path.basename(file_path)}", 'public_uid': file_path}
+
+
+@pytest.fixture
+def chart(tmp_path):
+    path = str(tmp_path / 'chart.png')
+    Image.new('RGBA', (800, 400), (10, 20, 30, 255)).save(path)
+    return path
+
+
+@pytest.fixture
+def pool():
+    try:
+        yield variants.variant_pool
+    finally:
+        variants.variant_pool.shutdown()
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    monkeypatch.setattr(config, 'IMAGE_VARIANT_WIDTHS', [320, 640, 1280])
+    monkeypatch.setattr(config, 'IMAGE_VARIANT_FORMATS', ['webp', 'jpeg'])
+
+
+def _create(backend, path):
+    return asyncio.run(variants.create_variants(backend, path, tags='eurusd', caption='entry', parent='trade'))
+
+
+def test_narrower_widths_in_every_format(chart):
+    made = variants.make_variants(chart, [640, 320, 1280, 320], ['webp', 'jpeg'], 80)
+
+    assert [(variant['width'], variant['format']) for variant in made] == [
+        (320, 'webp'), (320, 'jpeg'), (640, 'webp'), (640, 'jpeg'),
+    ]
+    for variant in made:
+        with Image.open(variant['path']) as image:
+            assert image.size == (variant['width'], variant['width'] // 2)
+            assert image.format == variants.PIL_FORMATS[variant['format']]
+
+
+def test_variants_are_stored_and_their_files_removed(chart, pool, configured):
+    backend = RecordingBackend()
+    stored = _create(backend, chart)
+
+    assert len(stored) == 4
+    assert sorted(variant['public_uid'] for variant in stored) == sorted(backend.stored)
+    assert all(variant['url'].startswith('https://images.example.com/') for variant in stored)
+    # the backend has them, only the original stays staged
+    assert os.listdir(os.path.dirname(chart)) == ['chart.png']
+
+
+def test_a_refused_variant_is_left_out(chart, pool, configured):
+    stored = _create(RecordingBackend(failing=['-320w.webp']), chart)
+
+    assert [(variant['width'], variant['format']) for variant in stored] == [(320, 'jpeg'), (640, 'webp'), (640, 'jpeg')]
+    assert os.listdir(os.path.dirname(chart)) == ['chart.png']
+
+
+def test_undecodable_images_get_no_variants(tmp_path, pool, configured):
+    path = str(tmp_path / 'chart.png')
+    with open(path, 'wb') as staged:
+        staged.write(b'not an image')
+    assert _create(RecordingBackend(), path) == []
+
+
+def test_variants_can_be_disabled(chart, monkeypatch):
+    monkeypatch.setattr(config, 'IMAGE_VARIANT_WIDTHS', [])
+    assert _create(RecordingBackend(), chart) == []